@@ -0,0 +1,226 @@
+# builder/split_checkpoint.py
+"""
+Splits a full checkpoint into a diffusion-model-only safetensors file.
+
+TastySin HIGH/LOW are loaded with CheckpointLoaderSimple, but the text encoder
+and VAE come from separate files (nodes 3/4), so any embedded encoder/VAE
+weights are read from the network volume for nothing. This tool streams the
+source file tensor by tensor (never loading it whole), keeps only the
+diffusion model weights, optionally re-casts float tensors to another dtype,
+and writes a manifest next to the output.
+
+When <name>-dit.safetensors exists in diffusion_models, the handler loads it
+with UNETLoader instead of the full checkpoint.
+
+Usage:
+    python split_checkpoint.py /runpod-volume/ComfyUI/models/checkpoints/TastySin-HIGH-v8.1.safetensors \
+        --output-dir /runpod-volume/ComfyUI/models/diffusion_models [--dtype fp16]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+
+DIFFUSION_MODEL_PREFIX = "model.diffusion_model."
+SPLIT_SUFFIX = "-dit"
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+HEADER_ALIGNMENT = 8
+
+# safetensors dtype name -> (bytes per element, torch dtype name)
+DTYPES = {
+    "F64": (8, "float64"),
+    "F32": (4, "float32"),
+    "F16": (2, "float16"),
+    "BF16": (2, "bfloat16"),
+    "F8_E4M3": (1, "float8_e4m3fn"),
+    "F8_E5M2": (1, "float8_e5m2"),
+    "I64": (8, "int64"),
+    "I32": (4, "int32"),
+    "I16": (2, "int16"),
+    "I8": (1, "int8"),
+    "U8": (1, "uint8"),
+    "BOOL": (1, "bool"),
+}
+CAST_TARGETS = {"fp32": "F32", "fp16": "F16", "bf16": "BF16"}
+CASTABLE = ("F64", "F32", "F16", "BF16")
+
+
+def read_header(f):
+    """Return (header dict, data section offset) of an open safetensors file"""
+    header_size = struct.unpack("<Q", f.read(8))[0]
+    header = json.loads(f.read(header_size))
+    return header, 8 + header_size
+
+
+def encode_header(header):
+    data = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    data += b" " * (-len(data) % HEADER_ALIGNMENT)
+    return struct.pack("<Q", len(data)) + data
+
+
+def element_count(shape):
+    count = 1
+    for dim in shape:
+        count *= dim
+    return count
+
+
+def cast_tensor_bytes(data, shape, source_dtype, target_dtype):
+    """Re-cast one tensor's raw bytes; torch is only needed when casting"""
+    if not data:
+        # torch.frombuffer rejects an empty buffer
+        return data
+    import torch
+    tensor = torch.frombuffer(bytearray(data), dtype=getattr(torch, DTYPES[source_dtype][1])).reshape(shape)
+    tensor = tensor.to(getattr(torch, DTYPES[target_dtype][1]))
+    # Flatten first: a 0-dim tensor can't be viewed as bytes
+    return tensor.contiguous().reshape(-1).view(torch.uint8).numpy().tobytes()
+
+
+def is_scale_tensor(name):
+    """fp8 scaled checkpoints store per-layer scales next to the weights (scale_weight, scale_input)"""
+    return name.rsplit(".", 1)[-1].startswith("scale")
+
+
+def plan_split(header, prefix=DIFFUSION_MODEL_PREFIX, keep_prefix=False, target_dtype=None):
+    """Select diffusion model tensors and compute the output layout
+
+    Returns (entries, skipped) where entries are
+    (output name, source info, output dtype, output byte size) in output order.
+    Empty tensors are copied as-is, and so are scale tensors when the file has
+    fp8 weights: the scales stay in the precision the fp8 kernels expect.
+    """
+    entries = []
+    skipped = {}
+    has_fp8 = any(info["dtype"].startswith("F8_") for name, info in header.items() if name != "__metadata__")
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        if not name.startswith(prefix):
+            group = name.split(".", 1)[0]
+            skipped[group] = skipped.get(group, 0) + 1
+            continue
+        out_name = name if keep_prefix else name[len(prefix):]
+        out_dtype = info["dtype"]
+        keep_dtype = element_count(info["shape"]) == 0 or (has_fp8 and is_scale_tensor(name))
+        if target_dtype and out_dtype in CASTABLE and not keep_dtype:
+            out_dtype = target_dtype
+        out_size = element_count(info["shape"]) * DTYPES[out_dtype][0]
+        entries.append((out_name, info, out_dtype, out_size))
+    # Keep the source order so the source file is read sequentially
+    entries.sort(key=lambda entry: entry[1]["data_offsets"][0])
+    return entries, skipped
+
+
+def split_checkpoint(source_path, output_path, prefix=DIFFUSION_MODEL_PREFIX, keep_prefix=False, dtype=None):
+    """Stream source_path into a diffusion-model-only output_path; returns the manifest"""
+    target_dtype = CAST_TARGETS[dtype] if dtype else None
+
+    with open(source_path, "rb") as src:
+        header, data_start = read_header(src)
+        entries, skipped = plan_split(header, prefix, keep_prefix, target_dtype)
+        if not entries:
+            raise Exception(f"No tensors with prefix '{prefix}' in {source_path} "
+                            f"(already a diffusion-model-only file?)")
+
+        out_header = {}
+        metadata = dict(header.get("__metadata__", {}))
+        metadata["split_from"] = os.path.basename(source_path)
+        out_header["__metadata__"] = metadata
+        offset = 0
+        for out_name, info, out_dtype, out_size in entries:
+            out_header[out_name] = {
+                "dtype": out_dtype,
+                "shape": info["shape"],
+                "data_offsets": [offset, offset + out_size],
+            }
+            offset += out_size
+
+        digest = hashlib.sha256()
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, "wb") as dst:
+            header_bytes = encode_header(out_header)
+            dst.write(header_bytes)
+            digest.update(header_bytes)
+
+            for index, (out_name, info, out_dtype, out_size) in enumerate(entries):
+                begin, end = info["data_offsets"]
+                src.seek(data_start + begin)
+                if out_dtype != info["dtype"]:
+                    data = cast_tensor_bytes(src.read(end - begin), info["shape"], info["dtype"], out_dtype)
+                    dst.write(data)
+                    digest.update(data)
+                else:
+                    remaining = end - begin
+                    while remaining > 0:
+                        chunk = src.read(min(COPY_CHUNK_SIZE, remaining))
+                        if not chunk:
+                            raise Exception(f"Unexpected end of file while reading {out_name}")
+                        dst.write(chunk)
+                        digest.update(chunk)
+                        remaining -= len(chunk)
+                if (index + 1) % 100 == 0 or index + 1 == len(entries):
+                    print(f"   Progress: {index + 1}/{len(entries)} tensors")
+        os.replace(tmp_path, output_path)
+
+    dtypes = {}
+    for _, _, out_dtype, _ in entries:
+        dtypes[out_dtype] = dtypes.get(out_dtype, 0) + 1
+    manifest = {
+        "source": os.path.abspath(source_path),
+        "source_size": os.path.getsize(source_path),
+        "output": os.path.abspath(output_path),
+        "output_size": os.path.getsize(output_path),
+        "output_sha256": digest.hexdigest(),
+        "prefix": prefix,
+        "prefix_stripped": not keep_prefix,
+        "cast_to": target_dtype,
+        "tensors": len(entries),
+        "dtypes": dtypes,
+        "skipped": skipped,
+    }
+    with open(output_path + ".manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def default_output_path(source_path, output_dir=None):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(output_dir or os.path.dirname(source_path), f"{stem}{SPLIT_SUFFIX}.safetensors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split a checkpoint into a diffusion-model-only safetensors file")
+    parser.add_argument("source", help="Full checkpoint (.safetensors)")
+    parser.add_argument("--output", help="Output file (default: <name>-dit.safetensors)")
+    parser.add_argument("--output-dir", help="Output directory for the default file name")
+    parser.add_argument("--dtype", choices=sorted(CAST_TARGETS), help="Re-cast float tensors (fp8 weights and their scales are kept)")
+    parser.add_argument("--prefix", default=DIFFUSION_MODEL_PREFIX, help="Prefix of diffusion model tensors")
+    parser.add_argument("--keep-prefix", action="store_true", help="Keep the prefix in tensor names")
+    args = parser.parse_args()
+
+    output_path = args.output or default_output_path(args.source, args.output_dir)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    print("=" * 60)
+    print(f"✂️ Splitting {args.source}")
+    print(f"   Output: {output_path}")
+    print("=" * 60)
+    try:
+        manifest = split_checkpoint(args.source, output_path, args.prefix, args.keep_prefix, args.dtype)
+    except Exception as e:
+        print(f"\n❌ ERROR: {e}")
+        sys.exit(1)
+
+    mb = 1024 * 1024
+    print(f"\n✅ Wrote {manifest['tensors']} tensors: {manifest['output_size'] / mb:.1f} MB "
+          f"(source {manifest['source_size'] / mb:.1f} MB)")
+    if manifest["skipped"]:
+        print(f"   Skipped: {manifest['skipped']}")
+
+
+if __name__ == "__main__":
+    main()
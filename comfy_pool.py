@@ -0,0 +1,168 @@
+"""
+Pool of ComfyUI instances (one per GPU) for the DaSiWa I2V worker.
+
+Jobs go to the least-loaded healthy instance, judged by the handler's own
+in-flight count and the instance's /queue depth. Each instance has its own
+LoRA-affinity scheduler so jobs sharing a LoRA set run back to back there.
+"""
+
+import json
+import logging
+import threading
+import time
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+
+class LoraAffinityScheduler:
+    """Serializes ComfyUI submissions, giving priority to jobs that reuse the current LoRA set"""
+
+    def __init__(self, max_run):
+        self.max_run = max(max_run, 1)
+        self.current_key = None
+        self._cond = threading.Condition()
+        self._busy = False
+        self._waiting = []
+        self._next_ticket = 0
+        self._run_length = 0
+
+    def _pick(self):
+        if self._run_length < self.max_run:
+            for ticket, key in self._waiting:
+                if key == self.current_key:
+                    return ticket
+        return self._waiting[0][0]
+
+    def acquire(self, key):
+        with self._cond:
+            entry = (self._next_ticket, key)
+            self._next_ticket += 1
+            self._waiting.append(entry)
+            while self._busy or self._pick() != entry[0]:
+                self._cond.wait()
+            self._waiting.remove(entry)
+            self._busy = True
+            if key == self.current_key:
+                self._run_length += 1
+            else:
+                self.current_key = key
+                self._run_length = 1
+
+    def release(self):
+        with self._cond:
+            self._busy = False
+            self._cond.notify_all()
+
+
+class ComfyBackend:
+    """One ComfyUI instance: address, output directory, health and load"""
+
+    def __init__(self, address, output_dir, lora_affinity_max_run=8):
+        self.address = address
+        self.output_dir = output_dir
+        self.scheduler = LoraAffinityScheduler(lora_affinity_max_run)
+        self.healthy = True
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.last_check = 0.0
+
+    @property
+    def http_url(self):
+        return f"http://{self.address}/"
+
+    def ws_url(self, client_id):
+        return f"ws://{self.address}/ws?clientId={client_id}"
+
+    def check(self, timeout=5):
+        """Refresh health and queue depth from /queue"""
+        self.last_check = time.time()
+        try:
+            with urllib.request.urlopen(f"http://{self.address}/queue", timeout=timeout) as response:
+                queue = json.loads(response.read())
+            self.queue_depth = len(queue.get("queue_running", [])) + len(queue.get("queue_pending", []))
+            if not self.healthy:
+                logger.info(f"ComfyUI backend {self.address} is healthy again")
+            self.healthy = True
+        except Exception as e:
+            if self.healthy:
+                logger.warning(f"ComfyUI backend {self.address} failed health check: {e}")
+            self.healthy = False
+        return self.healthy
+
+    @property
+    def load(self):
+        # in_flight includes jobs waiting in our scheduler; queue_depth also sees other clients
+        return max(self.in_flight, self.queue_depth)
+
+
+class BackendPool:
+    """Dispatches jobs to the least-loaded healthy ComfyUI backend"""
+
+    def __init__(self, backends, health_check_interval=10.0):
+        if not backends:
+            raise Exception("No ComfyUI backends configured")
+        self.backends = backends
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, host, ports, output_dirs, lora_affinity_max_run=8, health_check_interval=10.0):
+        """Build a pool from comma-separated port and output directory lists"""
+        port_list = [p.strip() for p in ports.split(",") if p.strip()]
+        dir_list = [d.strip() for d in output_dirs.split(",") if d.strip()]
+        if len(dir_list) == 1:
+            dir_list = dir_list * len(port_list)
+        if len(dir_list) != len(port_list):
+            raise Exception(f"COMFYUI_OUTPUT_DIRS ({len(dir_list)}) does not match COMFYUI_PORTS ({len(port_list)})")
+        backends = [
+            ComfyBackend(f"{host}:{port}", output_dir, lora_affinity_max_run)
+            for port, output_dir in zip(port_list, dir_list)
+        ]
+        return cls(backends, health_check_interval)
+
+    def _refresh(self, force=False):
+        """Health-check stale backends; runs outside the pool lock so a dead instance never stalls dispatch"""
+        now = time.time()
+        with self._lock:
+            # Claim the checks (check() is slow for a dead instance) so concurrent callers skip them
+            stale = [b for b in self.backends if force or now - b.last_check >= self.health_check_interval]
+            for backend in stale:
+                backend.last_check = now
+        for backend in stale:
+            backend.check()
+
+    def acquire(self, lora_key, exclude=(), wait_timeout=180):
+        """Reserve the best backend for a job; waits up to wait_timeout for one to become healthy"""
+        deadline = time.time() + wait_timeout
+        force = False
+        while True:
+            self._refresh(force)
+            with self._lock:
+                candidates = [b for b in self.backends if b.healthy and b not in exclude]
+                if candidates:
+                    # Least loaded first; on equal load prefer the one with this LoRA set applied
+                    backend = min(candidates, key=lambda b: (b.load, b.scheduler.current_key != lora_key))
+                    backend.in_flight += 1
+                    return backend
+            if time.time() >= deadline:
+                raise Exception("Cannot connect to ComfyUI server.")
+            logger.warning("No healthy ComfyUI backend, waiting...")
+            force = True
+            time.sleep(1)
+
+    def release(self, backend):
+        with self._lock:
+            backend.in_flight -= 1
+
+    def mark_unhealthy(self, backend):
+        with self._lock:
+            backend.healthy = False
+            backend.last_check = time.time()
+        logger.warning(f"ComfyUI backend {backend.address} marked unhealthy")
+
+    def stats(self):
+        return [
+            {"address": b.address, "healthy": b.healthy, "in_flight": b.in_flight, "queue_depth": b.queue_depth}
+            for b in self.backends
+        ]
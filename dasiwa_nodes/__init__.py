@@ -0,0 +1,25 @@
+"""
+DaSiWa worker custom nodes for ComfyUI (copied to /ComfyUI/custom_nodes/dasiwa_nodes).
+"""
+
+from .interpolation import DaSiWaFrameBlend
+from .raw_frames import DaSiWaSaveRawFrames
+from .text_cache import DaSiWaCachedTextEncode
+from .latent_cache import DaSiWaCachedWanImageToVideo
+from .upscale import DaSiWaUpscaleFrames
+
+NODE_CLASS_MAPPINGS = {
+    "DaSiWaFrameBlend": DaSiWaFrameBlend,
+    "DaSiWaSaveRawFrames": DaSiWaSaveRawFrames,
+    "DaSiWaCachedTextEncode": DaSiWaCachedTextEncode,
+    "DaSiWaCachedWanImageToVideo": DaSiWaCachedWanImageToVideo,
+    "DaSiWaUpscaleFrames": DaSiWaUpscaleFrames,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "DaSiWaFrameBlend": "DaSiWa Frame Blend Interpolation",
+    "DaSiWaSaveRawFrames": "DaSiWa Save Raw Frames",
+    "DaSiWaCachedTextEncode": "DaSiWa Cached Text Encode",
+    "DaSiWaCachedWanImageToVideo": "DaSiWa Cached Wan Image To Video",
+    "DaSiWaUpscaleFrames": "DaSiWa Upscale Frames (Batched)",
+}
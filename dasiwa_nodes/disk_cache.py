@@ -0,0 +1,114 @@
+"""
+On-disk LRU store shared by workers through the network volume.
+
+Entries are plain files named by key; reads refresh the mtime, which is what
+eviction orders by. Writes go to a temp file and are renamed into place, so
+concurrent workers never see partial entries.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+DIGEST_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+def hash_key(*parts):
+    """sha256 hex key of the given string parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def file_digest(path, digest_dir=None):
+    """sha256 of a file, remembered in digest_dir by path, size and mtime"""
+    stat = os.stat(path)
+    record_path = None
+    if digest_dir:
+        os.makedirs(digest_dir, exist_ok=True)
+        record_path = os.path.join(digest_dir, hash_key(os.path.realpath(path)) + ".json")
+        try:
+            with open(record_path, "r") as f:
+                record = json.load(f)
+            if record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns:
+                return record["sha256"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DIGEST_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    if record_path:
+        _atomic_write(record_path, json.dumps({
+            "path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256
+        }).encode("utf-8"))
+    return sha256
+
+
+def _atomic_write(path, data):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class DiskLRUCache:
+    """Bytes store in a directory, evicting least recently used entries above max_bytes"""
+
+    def __init__(self, root, max_bytes, suffix=".bin"):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key + self.suffix)
+
+    def contains(self, key):
+        return os.path.isfile(self._path(key))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        _atomic_write(self._path(key), data)
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.root):
+                if not name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.root, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except OSError:
+                    pass
+                total -= size
@@ -0,0 +1,40 @@
+"""
+Blend frame interpolation - CPU-friendly fallback when no RIFE node/checkpoint is available.
+"""
+
+import torch
+
+
+def blend_interpolate(frames, multiplier):
+    """Insert multiplier - 1 linearly blended frames between each pair of frames
+
+    frames: IMAGE tensor [N, H, W, C]; returns [(N - 1) * multiplier + 1, H, W, C]
+    """
+    if multiplier < 2 or frames.shape[0] < 2:
+        return frames
+    count = frames.shape[0]
+    out = torch.empty(((count - 1) * multiplier + 1,) + tuple(frames.shape[1:]), dtype=frames.dtype, device=frames.device)
+    for step in range(multiplier):
+        t = step / multiplier
+        # Frames step, step + multiplier, ... blend every pair at the same position t
+        out[step:-1:multiplier] = torch.lerp(frames[:-1], frames[1:], t)
+    out[-1] = frames[-1]
+    return out
+
+
+class DaSiWaFrameBlend:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frames": ("IMAGE",),
+                "multiplier": ("INT", {"default": 2, "min": 1, "max": 8}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE",)
+    FUNCTION = "interpolate"
+    CATEGORY = "DaSiWa"
+
+    def interpolate(self, frames, multiplier):
+        return (blend_interpolate(frames, multiplier),)
@@ -0,0 +1,167 @@
+"""
+Start-image latent cache for WanImageToVideo.
+
+The VAE-encoded start image (concat_latent_image) only depends on the image
+content, the adjusted width/height, the length and the VAE weights. It is kept
+in a bounded in-memory LRU and in a DiskLRUCache on the volume; a hit skips the
+VAE encode pass entirely.
+"""
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import torch
+
+from .disk_cache import DiskLRUCache, file_digest, hash_key
+
+
+def tensor_digest(tensor):
+    """sha256 of a tensor's contents (CPU, contiguous)"""
+    return hashlib.sha256(tensor.detach().cpu().contiguous().numpy().tobytes()).hexdigest()
+
+
+class LatentCache:
+    """Memory + disk latent store with hit/miss counters"""
+
+    def __init__(self, store, memory_max_bytes):
+        self.store = store
+        self.memory_max_bytes = memory_max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key, tensor):
+        size = tensor.numel() * tensor.element_size()
+        if size > self.memory_max_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = tensor
+            self._memory_bytes += size
+            while self._memory_bytes > self.memory_max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.numel() * evicted.element_size()
+
+    def get_or_encode(self, key, encode_fn):
+        """Return (latent, tier) with tier "memory", "disk" or None (encoded)"""
+        with self._lock:
+            tensor = self._memory.get(key)
+            if tensor is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return tensor, "memory"
+
+        data = self.store.get(key)
+        if data is not None:
+            try:
+                tensor = torch.load(io.BytesIO(data), weights_only=True)
+                self._remember(key, tensor)
+                self.disk_hits += 1
+                return tensor, "disk"
+            except Exception:
+                # Corrupt or incompatible entry - re-encode and overwrite
+                pass
+
+        tensor = encode_fn().cpu()
+        buffer = io.BytesIO()
+        torch.save(tensor, buffer)
+        self.store.put(key, buffer.getvalue())
+        self._remember(key, tensor)
+        self.misses += 1
+        return tensor, None
+
+
+class DaSiWaCachedWanImageToVideo:
+    """WanImageToVideo (start image only) with a cached start-image latent"""
+
+    _caches = {}
+    _vae_digests = {}
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        import folder_paths
+        return {
+            "required": {
+                "positive": ("CONDITIONING",),
+                "negative": ("CONDITIONING",),
+                "vae": ("VAE",),
+                "width": ("INT", {"default": 832, "min": 16, "max": 16384, "step": 16}),
+                "height": ("INT", {"default": 480, "min": 16, "max": 16384, "step": 16}),
+                "length": ("INT", {"default": 81, "min": 1, "max": 16384, "step": 4}),
+                "batch_size": ("INT", {"default": 1, "min": 1, "max": 4096}),
+                "start_image": ("IMAGE",),
+                "vae_name": (folder_paths.get_filename_list("vae"),),
+                "cache_dir": ("STRING", {"default": "/runpod-volume/cache/start_latents"}),
+                "cache_max_mb": ("INT", {"default": 4096, "min": 1}),
+                "memory_max_mb": ("INT", {"default": 512, "min": 0}),
+            }
+        }
+
+    RETURN_TYPES = ("CONDITIONING", "CONDITIONING", "LATENT")
+    RETURN_NAMES = ("positive", "negative", "latent")
+    FUNCTION = "encode"
+    CATEGORY = "DaSiWa"
+
+    @classmethod
+    def _get_cache(cls, cache_dir, cache_max_mb, memory_max_mb):
+        cache_key = (cache_dir, cache_max_mb, memory_max_mb)
+        if cache_key not in cls._caches:
+            store = DiskLRUCache(cache_dir, cache_max_mb * 1024 * 1024, suffix=".latent")
+            cls._caches[cache_key] = LatentCache(store, memory_max_mb * 1024 * 1024)
+        return cls._caches[cache_key]
+
+    @classmethod
+    def _vae_digest(cls, vae_name, cache_dir):
+        import folder_paths
+        if vae_name not in cls._vae_digests:
+            vae_path = folder_paths.get_full_path_or_raise("vae", vae_name)
+            cls._vae_digests[vae_name] = file_digest(vae_path, os.path.join(cache_dir, "digests"))
+        return cls._vae_digests[vae_name]
+
+    def encode(self, positive, negative, vae, width, height, length, batch_size, start_image,
+               vae_name, cache_dir, cache_max_mb, memory_max_mb):
+        import comfy.model_management
+        import comfy.utils
+        import node_helpers
+
+        latent = torch.zeros([batch_size, 16, ((length - 1) // 4) + 1, height // 8, width // 8],
+                             device=comfy.model_management.intermediate_device())
+        start_image = start_image[:length]
+
+        def encode_fn():
+            # Same padding as WanImageToVideo: start frames followed by mid-gray frames
+            scaled = comfy.utils.common_upscale(start_image.movedim(-1, 1), width, height, "bilinear", "center").movedim(1, -1)
+            image = torch.ones((length, height, width, scaled.shape[-1]), device=scaled.device, dtype=scaled.dtype) * 0.5
+            image[:scaled.shape[0]] = scaled
+            return vae.encode(image[:, :, :, :3])
+
+        cache = self._get_cache(cache_dir, cache_max_mb, memory_max_mb)
+        key = hash_key("wan_i2v_start_latent", tensor_digest(start_image), width, height, length,
+                       self._vae_digest(vae_name, cache_dir))
+        concat_latent_image, tier = cache.get_or_encode(key, encode_fn)
+
+        mask = torch.ones((1, 1, latent.shape[2], concat_latent_image.shape[-2], concat_latent_image.shape[-1]),
+                          device=start_image.device, dtype=start_image.dtype)
+        mask[:, :, :((start_image.shape[0] - 1) // 4) + 1] = 0.0
+
+        values = {"concat_latent_image": concat_latent_image, "concat_mask": mask}
+        positive = node_helpers.conditioning_set_values(positive, values)
+        negative = node_helpers.conditioning_set_values(negative, values)
+        return {
+            "ui": {"latent_cache": [{
+                "hit": tier is not None,
+                "tier": tier,
+                "memory_hits": cache.memory_hits,
+                "disk_hits": cache.disk_hits,
+                "misses": cache.misses,
+            }]},
+            "result": (positive, negative, {"samples": latent}),
+        }
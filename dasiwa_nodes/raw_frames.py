@@ -0,0 +1,46 @@
+"""
+Raw frame sink - writes decoded frames as a raw rgb24 stream so the handler can
+encode the video outside ComfyUI while the next prompt is already sampling.
+"""
+
+import os
+
+
+class DaSiWaSaveRawFrames:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "images": ("IMAGE",),
+                "frame_rate": ("FLOAT", {"default": 16.0, "min": 1.0, "step": 1.0}),
+                "filename_prefix": ("STRING", {"default": "DaSiWa_raw"}),
+            }
+        }
+
+    RETURN_TYPES = ()
+    OUTPUT_NODE = True
+    FUNCTION = "save"
+    CATEGORY = "DaSiWa"
+
+    def save(self, images, frame_rate, filename_prefix):
+        import folder_paths
+        frames, height, width = images.shape[0], images.shape[1], images.shape[2]
+        full_output_folder, filename, counter, _, _ = folder_paths.get_save_image_path(
+            filename_prefix, folder_paths.get_output_directory(), width, height
+        )
+        fullpath = os.path.join(full_output_folder, f"{filename}_{counter:05}.rgb")
+
+        # One frame at a time keeps the uint8 copy small
+        with open(fullpath, "wb") as f:
+            for frame in images:
+                f.write((frame[:, :, :3] * 255.0).round().clamp(0, 255).byte().cpu().numpy().tobytes())
+
+        info = {
+            "fullpath": fullpath,
+            "width": width,
+            "height": height,
+            "frames": frames,
+            "frame_rate": frame_rate,
+            "pix_fmt": "rgb24",
+        }
+        return {"ui": {"raw_frames": [info]}}
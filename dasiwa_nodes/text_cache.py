@@ -0,0 +1,123 @@
+"""
+Persistent text-conditioning cache for the UMT5 encoder.
+
+Conditioning is keyed by the encoder file digest, encoder type and prompt text
+and stored in a DiskLRUCache on the volume, so it survives restarts and is
+shared across workers. A hit returns the stored tensors without loading the
+text encoder at all: the encoder comes from CLIPLoader (node 4) through a lazy
+input that is only requested on a miss, so it lives in ComfyUI's own node cache
+and model management and is released by /free like any other model.
+"""
+
+import io
+import os
+
+import torch
+
+from .disk_cache import DiskLRUCache, file_digest, hash_key
+
+
+def serialize_conditioning(conditioning):
+    """CONDITIONING ([[tensor, dict], ...]) -> bytes, tensors moved to CPU"""
+    cpu_conditioning = []
+    for tensor, extra in conditioning:
+        cpu_extra = {k: (v.cpu() if isinstance(v, torch.Tensor) else v) for k, v in extra.items()}
+        cpu_conditioning.append([tensor.cpu(), cpu_extra])
+    buffer = io.BytesIO()
+    torch.save(cpu_conditioning, buffer)
+    return buffer.getvalue()
+
+
+def deserialize_conditioning(data):
+    return torch.load(io.BytesIO(data), weights_only=True)
+
+
+class ConditioningCache:
+    """Conditioning store for one encoder, with hit/miss counters"""
+
+    def __init__(self, store, encoder_digest, encoder_type="wan"):
+        self.store = store
+        self.encoder_digest = encoder_digest
+        self.encoder_type = encoder_type
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text):
+        return hash_key("text_conditioning", self.encoder_digest, self.encoder_type, text)
+
+    def contains(self, text):
+        return self.store.contains(self.key(text))
+
+    def get_or_encode(self, text, encode_fn):
+        """Return (conditioning, hit); encode_fn(text) is only called on a miss"""
+        key = self.key(text)
+        data = self.store.get(key)
+        if data is not None:
+            try:
+                conditioning = deserialize_conditioning(data)
+                self.hits += 1
+                return conditioning, True
+            except Exception:
+                # Corrupt or incompatible entry - re-encode and overwrite
+                pass
+        conditioning = encode_fn(text)
+        self.store.put(key, serialize_conditioning(conditioning))
+        self.misses += 1
+        return conditioning, False
+
+
+class DaSiWaCachedTextEncode:
+    _caches = {}
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        import folder_paths
+        return {
+            "required": {
+                "text": ("STRING", {"multiline": True, "dynamicPrompts": True}),
+                "clip": ("CLIP", {"lazy": True}),
+                "clip_name": (folder_paths.get_filename_list("text_encoders"),),
+                "type": (["wan"],),
+                "device": (["default", "cpu"],),
+                "cache_dir": ("STRING", {"default": "/runpod-volume/cache/text_conditioning"}),
+                "cache_max_mb": ("INT", {"default": 2048, "min": 1}),
+            }
+        }
+
+    RETURN_TYPES = ("CONDITIONING",)
+    FUNCTION = "encode"
+    CATEGORY = "DaSiWa"
+
+    @classmethod
+    def _get_cache(cls, clip_name, encoder_type, cache_dir, cache_max_mb):
+        import folder_paths
+        clip_path = folder_paths.get_full_path_or_raise("text_encoders", clip_name)
+        cache_key = (clip_path, encoder_type, cache_dir, cache_max_mb)
+        if cache_key not in cls._caches:
+            store = DiskLRUCache(cache_dir, cache_max_mb * 1024 * 1024, suffix=".cond")
+            digest = file_digest(clip_path, os.path.join(cache_dir, "digests"))
+            cls._caches[cache_key] = ConditioningCache(store, digest, encoder_type)
+        return cls._caches[cache_key]
+
+    def check_lazy_status(self, text, clip_name, type, device, cache_dir, cache_max_mb, clip=None):
+        """Only ask ComfyUI to load the encoder (node 4) when the text is not cached"""
+        if clip is None and not self._get_cache(clip_name, type, cache_dir, cache_max_mb).contains(text):
+            return ["clip"]
+        return []
+
+    def encode(self, text, clip_name, type, device, cache_dir, cache_max_mb, clip=None):
+        import nodes
+        cache = self._get_cache(clip_name, type, cache_dir, cache_max_mb)
+
+        def encode_fn(prompt_text):
+            encoder = clip
+            if encoder is None:
+                # Entry evicted or unreadable after check_lazy_status - load for this miss only, nothing is retained
+                encoder = nodes.CLIPLoader().load_clip(clip_name, type, device)[0]
+            return nodes.CLIPTextEncode().encode(encoder, prompt_text)[0]
+
+        conditioning, hit = cache.get_or_encode(text, encode_fn)
+        return {
+            "ui": {"text_cache": [{"hit": hit, "hits": cache.hits, "misses": cache.misses}]},
+            "result": (conditioning,),
+        }
@@ -35,6 +35,8 @@ if [ -d "$NETWORK_VOLUME" ]; then
         rm -rf /ComfyUI/models/vae 2>/dev/null || true
         rm -rf /ComfyUI/models/text_encoders 2>/dev/null || true
         rm -rf /ComfyUI/models/loras 2>/dev/null || true
+        rm -rf /ComfyUI/models/upscale_models 2>/dev/null || true
+        rm -rf /ComfyUI/models/diffusion_models 2>/dev/null || true
         
         # Create symlinks
         mkdir -p /ComfyUI/models
@@ -59,6 +61,16 @@ if [ -d "$NETWORK_VOLUME" ]; then
             echo "   ✅ Linked loras"
         fi
         
+        if [ -d "$NETWORK_VOLUME/ComfyUI/models/upscale_models" ]; then
+            ln -sf "$NETWORK_VOLUME/ComfyUI/models/upscale_models" /ComfyUI/models/upscale_models
+            echo "   ✅ Linked upscale_models"
+        fi
+        
+        if [ -d "$NETWORK_VOLUME/ComfyUI/models/diffusion_models" ]; then
+            ln -sf "$NETWORK_VOLUME/ComfyUI/models/diffusion_models" /ComfyUI/models/diffusion_models
+            echo "   ✅ Linked diffusion_models"
+        fi
+        
         echo "✅ Symlinks created!"
     else
         echo "⚠️ ComfyUI/models not found in Network Volume"
@@ -80,6 +92,9 @@ echo "============================================================"
 
 HIGH_MODEL="/ComfyUI/models/checkpoints/TastySin-HIGH-v8.1.safetensors"
 LOW_MODEL="/ComfyUI/models/checkpoints/TastySin-LOW-v8.1.safetensors"
+# Split diffusion-model-only files (builder/split_checkpoint.py) can replace the full checkpoints
+[ ! -f "$HIGH_MODEL" ] && [ -f "/ComfyUI/models/diffusion_models/TastySin-HIGH-v8.1-dit.safetensors" ] && HIGH_MODEL="/ComfyUI/models/diffusion_models/TastySin-HIGH-v8.1-dit.safetensors"
+[ ! -f "$LOW_MODEL" ] && [ -f "/ComfyUI/models/diffusion_models/TastySin-LOW-v8.1-dit.safetensors" ] && LOW_MODEL="/ComfyUI/models/diffusion_models/TastySin-LOW-v8.1-dit.safetensors"
 VAE_MODEL="/ComfyUI/models/vae/wan_2.1_vae.safetensors"
 TEXT_ENCODER="/ComfyUI/models/text_encoders/umt5_xxl_fp8_e4m3fn_scaled.safetensors"
 
@@ -111,27 +126,76 @@ else
 fi
 
 # Start ComfyUI in the background
-echo "Starting ComfyUI in the background..."
-python /ComfyUI/main.py --listen --use-sage-attention &
+# Optional --cache-lru: number of cached node results (one prompt is ~15-25 nodes).
+# It does not keep LoRA-patched weights on the GPU; 0 = ComfyUI default cache.
+COMFY_CACHE_LRU="${COMFY_CACHE_LRU:-0}"
+# latent2rgb previews are sent over the WebSocket without an extra VAE pass
+COMFY_PREVIEW_SIZE="${COMFY_PREVIEW_SIZE:-256}"
+COMFY_ARGS="--listen --use-sage-attention --preview-method latent2rgb --preview-size $COMFY_PREVIEW_SIZE"
+if [ "$COMFY_CACHE_LRU" -gt 0 ]; then
+    COMFY_ARGS="$COMFY_ARGS --cache-lru $COMFY_CACHE_LRU"
+fi
+# ============================================================================
+# One ComfyUI instance per visible GPU
+# ============================================================================
+# GPU ids come from CUDA_VISIBLE_DEVICES, or nvidia-smi if it is not set.
+# COMFYUI_MAX_INSTANCES caps the number of instances (each one keeps its own
+# copy of the models in RAM). Ports start at COMFYUI_BASE_PORT.
+if [ -n "$CUDA_VISIBLE_DEVICES" ]; then
+    GPU_IDS=$(echo "$CUDA_VISIBLE_DEVICES" | tr ',' ' ')
+else
+    GPU_IDS=$(nvidia-smi --query-gpu=index --format=csv,noheader 2>/dev/null | tr '\n' ' ')
+fi
+[ -z "$GPU_IDS" ] && GPU_IDS="0"
 
-# Wait for ComfyUI to be ready
+COMFYUI_BASE_PORT="${COMFYUI_BASE_PORT:-8188}"
+COMFYUI_MAX_INSTANCES="${COMFYUI_MAX_INSTANCES:-8}"
+COMFYUI_PORTS=""
+COMFYUI_OUTPUT_DIRS=""
+instance=0
+for gpu_id in $GPU_IDS; do
+    [ $instance -ge $COMFYUI_MAX_INSTANCES ] && break
+    port=$((COMFYUI_BASE_PORT + instance))
+    if [ $instance -eq 0 ]; then
+        output_dir="/ComfyUI/output"
+        instance_args=""
+    else
+        # Separate output/temp dirs so one instance's cleanup never touches another's files
+        output_dir="/ComfyUI/output_gpu$instance"
+        instance_args="--output-directory $output_dir --temp-directory /ComfyUI/temp_gpu$instance"
+        mkdir -p "$output_dir" "/ComfyUI/temp_gpu$instance"
+    fi
+    echo "Starting ComfyUI on GPU $gpu_id (port $port) in the background..."
+    python /ComfyUI/main.py $COMFY_ARGS --cuda-device "$gpu_id" --port "$port" $instance_args &
+    COMFYUI_PORTS="${COMFYUI_PORTS:+$COMFYUI_PORTS,}$port"
+    COMFYUI_OUTPUT_DIRS="${COMFYUI_OUTPUT_DIRS:+$COMFYUI_OUTPUT_DIRS,}$output_dir"
+    instance=$((instance + 1))
+done
+export COMFYUI_PORTS COMFYUI_OUTPUT_DIRS
+
+# Wait for ComfyUI instances to be ready
 echo "Waiting for ComfyUI to be ready..."
 max_wait=120  # Maximum 2 minute wait
 wait_count=0
-while [ $wait_count -lt $max_wait ]; do
-    if curl -s http://127.0.0.1:8188/ > /dev/null 2>&1; then
-        echo "ComfyUI is ready!"
-        break
-    fi
-    echo "Waiting for ComfyUI... ($wait_count/$max_wait)"
-    sleep 2
-    wait_count=$((wait_count + 2))
+ready_count=0
+for port in $(echo "$COMFYUI_PORTS" | tr ',' ' '); do
+    while [ $wait_count -lt $max_wait ]; do
+        if curl -s http://127.0.0.1:$port/ > /dev/null 2>&1; then
+            echo "ComfyUI on port $port is ready!"
+            ready_count=$((ready_count + 1))
+            break
+        fi
+        echo "Waiting for ComfyUI on port $port... ($wait_count/$max_wait)"
+        sleep 2
+        wait_count=$((wait_count + 2))
+    done
 done
 
-if [ $wait_count -ge $max_wait ]; then
+if [ $ready_count -eq 0 ]; then
     echo "Error: ComfyUI failed to start within $max_wait seconds"
     exit 1
 fi
+echo "$ready_count/$instance ComfyUI instances ready (ports: $COMFYUI_PORTS)"
 
 # Start the handler in the foreground
 # This script becomes the main process of the container
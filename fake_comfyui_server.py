@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for one ComfyUI instance (/prompt, /queue, /history, /ws)
+Executes prompts one at a time with a fixed simulated duration, reports
+progress over the WebSocket like ComfyUI does and writes a fake video file
+for node 14, so BackendPool dispatch and handler failover can be exercised
+without GPUs. Start one per simulated GPU; --crash-after kills the instance
+in the middle of a prompt.
+
+Usage:
+    python fake_comfyui_server.py --port 8188 --output-dir /tmp/fake_comfyui/output &
+    python fake_comfyui_server.py --port 8189 --output-dir /tmp/fake_comfyui/output_gpu1 --crash-after 2 &
+    COMFYUI_PORTS=8188,8189 COMFYUI_OUTPUT_DIRS=/tmp/fake_comfyui/output,/tmp/fake_comfyui/output_gpu1 \
+        python handler.py --rp_serve_api
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT = 0x1
+WS_BINARY = 0x2
+WS_CLOSE = 0x8
+
+OUTPUT_NODE = "14"
+FAKE_VIDEO = b"\x00\x00\x00\x18ftypmp42fake-video"
+# Binary preview message: event 1 (PREVIEW_IMAGE), image type 1 (jpeg), then image bytes
+FAKE_PREVIEW = struct.pack(">II", 1, 1) + b"\xff\xd8\xff\xe0fake-preview\xff\xd9"
+
+
+def ws_frame(payload, opcode):
+    """Encode one unmasked server-to-client WebSocket frame"""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 65536:
+        header += bytes([126]) + struct.pack(">H", length)
+    else:
+        header += bytes([127]) + struct.pack(">Q", length)
+    return header + payload
+
+
+def ws_read_frame(rfile):
+    """Read one (masked) client frame; returns (opcode, payload), or None on EOF"""
+    head = rfile.read(2)
+    if len(head) < 2:
+        return None
+    opcode = head[0] & 0x0F
+    masked = head[1] & 0x80
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", rfile.read(8))[0]
+    mask = rfile.read(4) if masked else b"\x00" * 4
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(rfile.read(length)))
+    return opcode, payload
+
+
+class FakeComfyUI:
+    """Prompt queue executed by a single simulated sampler"""
+
+    def __init__(self, output_dir, prompt_seconds, crash_after):
+        self.output_dir = output_dir
+        self.prompt_seconds = prompt_seconds
+        self.crash_after = crash_after
+        self.lock = threading.Lock()
+        self.pending = []
+        self.running = None
+        self.history = {}
+        self.clients = {}
+        self.executed = 0
+        self.queue = queue.Queue()
+        self.number = 0
+        os.makedirs(output_dir, exist_ok=True)
+        threading.Thread(target=self._execute_loop, daemon=True).start()
+
+    def submit(self, prompt, client_id):
+        prompt_id = str(uuid.uuid4())
+        with self.lock:
+            number = self.number
+            self.number += 1
+            self.pending.append([number, prompt_id, prompt, {"client_id": client_id}, [OUTPUT_NODE]])
+        self.queue.put(prompt_id)
+        return prompt_id, number
+
+    def queue_state(self):
+        with self.lock:
+            return {
+                "queue_running": [self.running] if self.running else [],
+                "queue_pending": list(self.pending),
+            }
+
+    def send(self, client_id, payload, opcode=WS_TEXT):
+        with self.lock:
+            client = self.clients.get(client_id)
+        if client is None:
+            return
+        wfile, write_lock = client
+        try:
+            with write_lock:
+                wfile.write(ws_frame(payload, opcode))
+                wfile.flush()
+        except OSError:
+            pass
+
+    def send_json(self, client_id, message):
+        self.send(client_id, json.dumps(message).encode("utf-8"))
+
+    def _execute_loop(self):
+        while True:
+            prompt_id = self.queue.get()
+            with self.lock:
+                entry = next(e for e in self.pending if e[1] == prompt_id)
+                self.pending.remove(entry)
+                self.running = entry
+            client_id = entry[3]["client_id"]
+
+            self.send_json(client_id, {"type": "execution_start", "data": {"prompt_id": prompt_id}})
+            self.executed += 1
+            if self.crash_after and self.executed >= self.crash_after:
+                logger.warning(f"Simulating a crash during prompt {prompt_id}")
+                os._exit(1)
+
+            for node in ("11", "12"):
+                self.send_json(client_id, {"type": "executing", "data": {"node": node, "prompt_id": prompt_id}})
+                self.send(client_id, FAKE_PREVIEW, WS_BINARY)
+                time.sleep(self.prompt_seconds / 2)
+
+            video_path = os.path.join(self.output_dir, f"fake_{prompt_id}.mp4")
+            with open(video_path, "wb") as f:
+                f.write(FAKE_VIDEO)
+            outputs = {OUTPUT_NODE: {"gifs": [{
+                "filename": os.path.basename(video_path),
+                "subfolder": "",
+                "type": "output",
+                "format": "video/h264-mp4",
+                "fullpath": video_path,
+            }]}}
+            with self.lock:
+                self.history[prompt_id] = {"prompt": entry, "outputs": outputs, "status": {"completed": True}}
+                self.running = None
+            self.send_json(client_id, {"type": "executing", "data": {"node": None, "prompt_id": prompt_id}})
+            logger.info(f"Executed prompt {prompt_id} for client {client_id}")
+
+
+def make_handler(comfy):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, code, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            path = urlparse(self.path).path
+            if path == "/prompt":
+                if not isinstance(payload.get("prompt"), dict):
+                    return self._send(400, {"error": {"type": "invalid_prompt", "message": "Invalid prompt"}, "node_errors": {}})
+                prompt_id, number = comfy.submit(payload["prompt"], payload.get("client_id"))
+                return self._send(200, {"prompt_id": prompt_id, "number": number, "node_errors": {}})
+            if path == "/free":
+                return self._send(200, {})
+            self._send(404, {"error": "Not found"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/ws":
+                return self._websocket(parse_qs(url.query).get("clientId", [None])[0])
+            if url.path == "/":
+                return self._send(200, {})
+            if url.path == "/queue":
+                return self._send(200, comfy.queue_state())
+            if url.path.startswith("/history/"):
+                prompt_id = url.path[len("/history/"):]
+                with comfy.lock:
+                    entry = comfy.history.get(prompt_id)
+                return self._send(200, {prompt_id: entry} if entry else {})
+            if url.path == "/system_stats":
+                gb = 1024 ** 3
+                return self._send(200, {
+                    "system": {"ram_free": 64 * gb},
+                    "devices": [{"name": "fake", "vram_total": 24 * gb, "vram_free": 4 * gb,
+                                 "torch_vram_total": 20 * gb, "torch_vram_free": 1 * gb}],
+                })
+            self._send(404, {"error": "Not found"})
+
+        def _websocket(self, client_id):
+            key = self.headers.get("Sec-WebSocket-Key")
+            if not key or not client_id:
+                return self._send(400, {"error": "WebSocket upgrade with clientId required"})
+            accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("utf-8")).digest()).decode("utf-8")
+            self.send_response(101)
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", accept)
+            self.end_headers()
+            self.wfile.flush()
+
+            with comfy.lock:
+                comfy.clients[client_id] = (self.wfile, threading.Lock())
+            comfy.send_json(client_id, {"type": "status", "data": {"sid": client_id}})
+            try:
+                while True:
+                    frame = ws_read_frame(self.rfile)
+                    if frame is None or frame[0] == WS_CLOSE:
+                        break
+            except OSError:
+                pass
+            finally:
+                with comfy.lock:
+                    comfy.clients.pop(client_id, None)
+                self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for a ComfyUI instance")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8188)
+    parser.add_argument("--output-dir", default="/tmp/fake_comfyui/output", help="Where fake videos are written")
+    parser.add_argument("--prompt-seconds", type=float, default=2.0, help="Simulated execution time per prompt")
+    parser.add_argument("--crash-after", type=int, default=0, help="Exit while executing the Nth prompt (0 = never)")
+    args = parser.parse_args()
+
+    comfy = FakeComfyUI(args.output_dir, args.prompt_seconds, args.crash_after)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(comfy))
+    logger.info(f"Fake ComfyUI at http://{args.host}:{args.port} (output: {args.output_dir})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the RunPod serverless /run and /status API
+Simulates a pool of workers with queueing, cold starts and resolution-dependent
+execution time, for developing load_test.py without spending GPU time. Status
+responses carry a stand-in-only "coldStart" flag (RunPod does not report one),
+so load_test.py can check its cold-start inference against ground truth.
+
+Usage:
+    python fake_runpod_server.py --port 8000 --workers 2
+    python load_test.py --workload workload.json --base-url http://127.0.0.1:8000/v2
+"""
+
+import argparse
+import base64
+import json
+import logging
+import queue
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RUN_PATH = re.compile(r"^/v2/([^/]+)/run$")
+STATUS_PATH = re.compile(r"^/v2/([^/]+)/status/([^/]+)$")
+
+FAKE_VIDEO = base64.b64encode(b"\x00\x00\x00\x18ftypmp42fake-video").decode('utf-8')
+
+
+class FakeEndpoint:
+    """Queue plus simulated workers that scale to zero after an idle timeout"""
+
+    def __init__(self, workers, cold_start, idle_timeout, base_seconds, seconds_per_mpx_frame, time_scale):
+        self.cold_start = cold_start
+        self.idle_timeout = idle_timeout
+        self.base_seconds = base_seconds
+        self.seconds_per_mpx_frame = seconds_per_mpx_frame
+        self.time_scale = time_scale
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        for index in range(workers):
+            threading.Thread(target=self._worker, args=(f"fake-worker-{index}",), daemon=True).start()
+
+    def execution_seconds(self, job_input):
+        """Simulated sampling time: grows with width x height x length and steps"""
+        width = job_input.get("width", 528)
+        height = job_input.get("height", 768)
+        length = job_input.get("length", 81)
+        steps = job_input.get("steps", 4)
+        mpx_frames = width * height * length / 1e6
+        return self.base_seconds + self.seconds_per_mpx_frame * mpx_frames * steps / 4
+
+    def submit(self, job_input):
+        job_id = f"fake-{uuid.uuid4()}"
+        with self.lock:
+            self.jobs[job_id] = {"id": job_id, "status": "IN_QUEUE", "input": job_input, "submitted_at": time.time()}
+        self.queue.put(job_id)
+        return job_id
+
+    def status(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            status = {"id": job_id, "status": job["status"]}
+            for key in ("delayTime", "executionTime", "workerId", "coldStart", "output", "error"):
+                if key in job:
+                    status[key] = job[key]
+            return status
+
+    def _worker(self, worker_id):
+        last_active = None
+        while True:
+            job_id = self.queue.get()
+            with self.lock:
+                job = self.jobs[job_id]
+            # A worker that never ran or sat idle past the timeout starts cold
+            cold = last_active is None or time.time() - last_active > self.idle_timeout
+            if cold:
+                logger.info(f"{worker_id} cold start")
+                time.sleep(self.cold_start * self.time_scale)
+            started = time.time()
+            with self.lock:
+                job["status"] = "IN_PROGRESS"
+                job["workerId"] = worker_id
+                job["coldStart"] = cold
+                job["delayTime"] = int((started - job["submitted_at"]) * 1000)
+
+            time.sleep(self.execution_seconds(job["input"]) * self.time_scale)
+
+            with self.lock:
+                job["executionTime"] = int((time.time() - started) * 1000)
+                if job["input"].get("fail"):
+                    job["status"] = "FAILED"
+                    job["error"] = "Simulated failure"
+                else:
+                    job["status"] = "COMPLETED"
+                    job["output"] = {"video": FAKE_VIDEO}
+            last_active = time.time()
+
+
+def make_handler(endpoint):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if not RUN_PATH.match(self.path):
+                return self._send(404, {"error": "Not found"})
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            job_id = endpoint.submit(payload.get("input", {}))
+            self._send(200, {"id": job_id, "status": "IN_QUEUE"})
+
+        def do_GET(self):
+            match = STATUS_PATH.match(self.path)
+            if not match:
+                return self._send(404, {"error": "Not found"})
+            status = endpoint.status(match.group(2))
+            if status is None:
+                return self._send(404, {"error": "Job not found"})
+            self._send(200, status)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the RunPod /run and /status API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Simulated workers")
+    parser.add_argument("--cold-start", type=float, default=30.0, help="Cold start seconds")
+    parser.add_argument("--idle-timeout", type=float, default=5.0, help="Idle seconds (real time) before a worker scales down")
+    parser.add_argument("--base-seconds", type=float, default=5.0, help="Fixed seconds per job")
+    parser.add_argument("--seconds-per-mpx-frame", type=float, default=2.0, help="Seconds per megapixel-frame at 4 steps")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="Multiplier on all simulated durations")
+    args = parser.parse_args()
+
+    endpoint = FakeEndpoint(args.workers, args.cold_start, args.idle_timeout, args.base_seconds,
+                            args.seconds_per_mpx_frame, args.time_scale)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(endpoint))
+    logger.info(f"Fake RunPod API at http://{args.host}:{args.port}/v2/<endpoint_id>/run ({args.workers} workers)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ import requests
 import json
 import time
 import base64
+import hashlib
+import shutil
+import sqlite3
 from typing import Optional, Dict, Any, List, Union
 import logging
 
@@ -16,11 +19,86 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class BatchJournal:
+    """
+    Persistent SQLite journal of batch items, keyed by image content hash + parameters.
+    
+    Lets an interrupted batch skip completed items, reattach to in-flight
+    job ids and reuse results for identical images within a batch.
+    """
+    
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+        self.conn = sqlite3.connect(journal_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                item_key TEXT PRIMARY KEY,
+                image_hash TEXT NOT NULL,
+                params TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                job_id TEXT,
+                status TEXT NOT NULL,
+                output_path TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+    
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """SHA-256 of file content (streamed, no base64 encoding)"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def item_key(image_hash: str, params: Dict[str, Any]) -> str:
+        params_json = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(f"{image_hash}:{params_json}".encode('utf-8')).hexdigest()
+    
+    def get(self, item_key: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT item_key, image_hash, params, filename, job_id, status, output_path, error "
+            "FROM items WHERE item_key = ?", (item_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("item_key", "image_hash", "params", "filename", "job_id", "status", "output_path", "error")
+        return dict(zip(keys, row))
+    
+    def record(
+        self,
+        item_key: str,
+        image_hash: str,
+        params: Dict[str, Any],
+        filename: str,
+        status: str,
+        job_id: Optional[str] = None,
+        output_path: Optional[str] = None,
+        error: Optional[str] = None
+    ):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO items "
+            "(item_key, image_hash, params, filename, job_id, status, output_path, error, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (item_key, image_hash, json.dumps(params, sort_keys=True), filename,
+             job_id, status, output_path, error, time.time())
+        )
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.close()
+
+
 class GenerateVideoClient:
     def __init__(
         self,
         runpod_endpoint_id: str,
-        runpod_api_key: str
+        runpod_api_key: str,
+        api_base_url: str = "https://api.runpod.ai/v2"
     ):
         """
         Initialize Generate Video client
@@ -28,11 +106,13 @@ class GenerateVideoClient:
         Args:
             runpod_endpoint_id: RunPod endpoint ID
             runpod_api_key: RunPod API key
+            api_base_url: API base URL (e.g. a local stand-in from fake_runpod_server.py)
         """
         self.runpod_endpoint_id = runpod_endpoint_id
         self.runpod_api_key = runpod_api_key
-        self.runpod_api_endpoint = f"https://api.runpod.ai/v2/{runpod_endpoint_id}/run"
-        self.status_url = f"https://api.runpod.ai/v2/{runpod_endpoint_id}/status"
+        api_base_url = api_base_url.rstrip('/')
+        self.runpod_api_endpoint = f"{api_base_url}/{runpod_endpoint_id}/run"
+        self.status_url = f"{api_base_url}/{runpod_endpoint_id}/status"
         
         # Initialize HTTP session
         self.session = requests.Session()
@@ -102,28 +182,66 @@ class GenerateVideoClient:
             logger.error(f"❌ Job submission failed: {e}")
             return None
     
-    def wait_for_completion(self, job_id: str, check_interval: int = 10, max_wait_time: int = 1800) -> Dict[str, Any]:
+    def wait_for_completion(
+        self,
+        job_id: str,
+        check_interval: float = 10,
+        max_wait_time: int = 1800,
+        min_check_interval: float = 0.5,
+        backoff: float = 1.5
+    ) -> Dict[str, Any]:
         """
         Wait for job completion
         
+        Polls adaptively: starts at min_check_interval and backs off up to
+        check_interval, so short jobs are not rounded up to a full interval.
+        
         Args:
             job_id: Job ID
-            check_interval: Status check interval (seconds)
+            check_interval: Maximum status check interval (seconds)
             max_wait_time: Maximum wait time (seconds)
+            min_check_interval: First status check interval (seconds)
+            backoff: Interval growth factor between checks
         
         Returns:
-            Job result dictionary
+            Job result dictionary (with 'timings'); status 'GONE' if the job id
+            is unknown or expired (HTTP 404/410)
         """
         start_time = time.time()
+        interval = min(min_check_interval, check_interval)
+        polls = 0
+        
+        def timings(status_data: Dict[str, Any], poll_seconds: float) -> Dict[str, Any]:
+            return {
+                'wait_seconds': time.time() - start_time,
+                'polls': polls,
+                'last_poll_seconds': poll_seconds,
+                'delay_ms': status_data.get('delayTime'),
+                'execution_ms': status_data.get('executionTime'),
+                'worker_id': status_data.get('workerId'),
+                # Only reported by endpoints that know it (e.g. fake_runpod_server.py)
+                'cold_start': status_data.get('coldStart')
+            }
         
         while time.time() - start_time < max_wait_time:
             try:
                 logger.info(f"⏱️ Checking job status... (Job ID: {job_id})")
                 
+                poll_start = time.time()
                 response = self.session.get(f"{self.status_url}/{job_id}", timeout=30)
+                if response.status_code in (404, 410):
+                    # Expired or unknown job id - retrying will not bring it back
+                    logger.error(f"❌ Job not found (HTTP {response.status_code})")
+                    return {
+                        'status': 'GONE',
+                        'error': f"Job not found (HTTP {response.status_code})",
+                        'job_id': job_id
+                    }
                 response.raise_for_status()
                 
                 status_data = response.json()
+                poll_seconds = time.time() - poll_start
+                polls += 1
                 status = status_data.get('status')
                 
                 if status == 'COMPLETED':
@@ -131,18 +249,21 @@ class GenerateVideoClient:
                     return {
                         'status': 'COMPLETED',
                         'output': status_data.get('output'),
-                        'job_id': job_id
+                        'job_id': job_id,
+                        'timings': timings(status_data, poll_seconds)
                     }
                 elif status == 'FAILED':
                     logger.error("❌ Job failed.")
                     return {
                         'status': 'FAILED',
                         'error': status_data.get('error', 'Unknown error'),
-                        'job_id': job_id
+                        'job_id': job_id,
+                        'timings': timings(status_data, poll_seconds)
                     }
                 elif status in ['IN_QUEUE', 'IN_PROGRESS']:
                     logger.info(f"🏃 Job in progress... (Status: {status})")
-                    time.sleep(check_interval)
+                    time.sleep(interval)
+                    interval = min(interval * backoff, check_interval)
                 else:
                     logger.warning(f"❓ Unknown status: {status}")
                     return {
@@ -201,7 +322,7 @@ class GenerateVideoClient:
             logger.error(f"❌ Video save failed: {e}")
             return False
     
-    def create_video_from_image(
+    def submit_video_from_image(
         self,
         image_path: str,
         prompt: str = "running man, grab the gun",
@@ -215,7 +336,7 @@ class GenerateVideoClient:
         lora_pairs: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
-        Generate video from image
+        Submit video generation job from image (without waiting)
         
         Args:
             image_path: Image file path
@@ -230,7 +351,7 @@ class GenerateVideoClient:
             lora_pairs: LoRA settings list (max 4)
         
         Returns:
-            Job result dictionary
+            {"job_id": ...} or {"error": ...}
         """
         # Check file existence
         if not os.path.exists(image_path):
@@ -265,12 +386,60 @@ class GenerateVideoClient:
             "lora_pairs": lora_pairs
         }
         
-        # Submit job and wait
+        # Submit job
         job_id = self.submit_job(input_data)
         if not job_id:
             return {"error": "Job submission failed"}
         
-        result = self.wait_for_completion(job_id)
+        return {"job_id": job_id}
+    
+    def create_video_from_image(
+        self,
+        image_path: str,
+        prompt: str = "running man, grab the gun",
+        width: int = 480,
+        height: int = 832,
+        length: int = 81,
+        steps: int = 10,
+        seed: int = 42,
+        cfg: float = 2.0,
+        context_overlap: int = 48,
+        lora_pairs: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate video from image
+        
+        Args:
+            image_path: Image file path
+            prompt: Prompt text
+            width: Output width
+            height: Output height
+            length: Number of frames
+            steps: Number of steps
+            seed: Seed value
+            cfg: CFG scale
+            context_overlap: Context overlap
+            lora_pairs: LoRA settings list (max 4)
+        
+        Returns:
+            Job result dictionary
+        """
+        submitted = self.submit_video_from_image(
+            image_path=image_path,
+            prompt=prompt,
+            width=width,
+            height=height,
+            length=length,
+            steps=steps,
+            seed=seed,
+            cfg=cfg,
+            context_overlap=context_overlap,
+            lora_pairs=lora_pairs
+        )
+        if "error" in submitted:
+            return submitted
+        
+        result = self.wait_for_completion(submitted["job_id"])
         return result
     
     def batch_process_images(
@@ -286,11 +455,16 @@ class GenerateVideoClient:
         seed: int = 42,
         cfg: float = 2.0,
         context_overlap: int = 48,
-        lora_pairs: Optional[List[Dict[str, Any]]] = None
+        lora_pairs: Optional[List[Dict[str, Any]]] = None,
+        journal_path: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Batch process all image files in folder
         
+        Progress is recorded in a journal, so rerunning an interrupted batch skips
+        completed items, reattaches to in-flight jobs and runs identical
+        image + parameter combinations only once.
+        
         Args:
             image_folder_path: Folder path containing image files
             output_folder_path: Folder path to save results
@@ -304,6 +478,7 @@ class GenerateVideoClient:
             cfg: CFG scale
             context_overlap: Context overlap
             lora_pairs: LoRA settings list
+            journal_path: SQLite journal path (default: <output_folder_path>/batch_journal.sqlite)
         
         Returns:
             Batch processing result dictionary
@@ -316,79 +491,129 @@ class GenerateVideoClient:
         os.makedirs(output_folder_path, exist_ok=True)
         
         # Get image file list
-        image_files = [
+        image_files = sorted(
             f for f in os.listdir(image_folder_path)
             if f.lower().endswith(valid_extensions)
-        ]
+        )
         
         if not image_files:
             return {"error": f"No image files to process: {image_folder_path}"}
         
-        logger.info(f"Starting batch processing: {len(image_files)} files")
+        journal = BatchJournal(journal_path or os.path.join(output_folder_path, "batch_journal.sqlite"))
+        logger.info(f"Starting batch processing: {len(image_files)} files (journal: {journal.journal_path})")
+        
+        params = {
+            "prompt": prompt,
+            "width": width,
+            "height": height,
+            "length": length,
+            "steps": steps,
+            "seed": seed,
+            "cfg": cfg,
+            "context_overlap": context_overlap,
+            "lora_pairs": lora_pairs or []
+        }
         
         results = {
             "total_files": len(image_files),
             "successful": 0,
             "failed": 0,
+            "reused": 0,
             "results": []
         }
         
         # Process each image file
-        for filename in image_files:
-            logger.info(f"\n==================== Processing started: {filename} ====================")
-            
-            image_path = os.path.join(image_folder_path, filename)
-            
-            # Generate video
-            result = self.create_video_from_image(
-                image_path=image_path,
-                prompt=prompt,
-                width=width,
-                height=height,
-                length=length,
-                steps=steps,
-                seed=seed,
-                cfg=cfg,
-                context_overlap=context_overlap,
-                lora_pairs=lora_pairs
-            )
-            
-            if result.get('status') == 'COMPLETED':
-                # Save result file
+        try:
+            for filename in image_files:
+                logger.info(f"\n==================== Processing started: {filename} ====================")
+                
+                image_path = os.path.join(image_folder_path, filename)
                 base_filename = os.path.splitext(filename)[0]
                 output_filename = os.path.join(output_folder_path, f"result_{base_filename}.mp4")
                 
-                if self.save_video_result(result, output_filename):
-                    logger.info(f"✅ [{filename}] Processing completed")
+                image_hash = BatchJournal.hash_file(image_path)
+                item_key = BatchJournal.item_key(image_hash, params)
+                entry = journal.get(item_key)
+                
+                # Completed earlier (or a duplicate earlier in this batch): reuse the output
+                if entry and entry["status"] == "completed" and entry["output_path"] and os.path.exists(entry["output_path"]):
+                    if os.path.abspath(entry["output_path"]) != os.path.abspath(output_filename):
+                        shutil.copyfile(entry["output_path"], output_filename)
+                    logger.info(f"⏭️ [{filename}] Already completed ({entry['filename']}), reusing output")
                     results["successful"] += 1
+                    results["reused"] += 1
                     results["results"].append({
                         "filename": filename,
                         "status": "success",
                         "output_file": output_filename,
-                        "job_id": result.get('job_id')
+                        "job_id": entry["job_id"],
+                        "reused_from": entry["filename"]
                     })
+                    continue
+                
+                # Reattach to a job submitted before the interruption
+                result = None
+                if entry and entry["status"] == "submitted" and entry["job_id"]:
+                    logger.info(f"🔗 [{filename}] Reattaching to job {entry['job_id']}")
+                    result = self.wait_for_completion(entry["job_id"])
+                    if result.get('status') == 'GONE':
+                        logger.warning(f"[{filename}] Job {entry['job_id']} is gone (expired), resubmitting")
+                        journal.record(item_key, image_hash, params, filename, "gone",
+                                       job_id=entry["job_id"], error=result.get('error'))
+                        result = None
+                    elif result.get('status') != 'COMPLETED':
+                        logger.warning(f"[{filename}] Reattached job ended with {result.get('status')}, resubmitting")
+                        result = None
+                
+                if result is None:
+                    submitted = self.submit_video_from_image(image_path=image_path, **params)
+                    if "error" in submitted:
+                        result = submitted
+                    else:
+                        journal.record(item_key, image_hash, params, filename, "submitted", job_id=submitted["job_id"])
+                        result = self.wait_for_completion(submitted["job_id"])
+                
+                if result.get('status') == 'COMPLETED':
+                    # Save result file
+                    if self.save_video_result(result, output_filename):
+                        logger.info(f"✅ [{filename}] Processing completed")
+                        journal.record(item_key, image_hash, params, filename, "completed",
+                                       job_id=result.get('job_id'), output_path=output_filename)
+                        results["successful"] += 1
+                        results["results"].append({
+                            "filename": filename,
+                            "status": "success",
+                            "output_file": output_filename,
+                            "job_id": result.get('job_id')
+                        })
+                    else:
+                        logger.error(f"[{filename}] Result save failed")
+                        journal.record(item_key, image_hash, params, filename, "failed",
+                                       job_id=result.get('job_id'), error="Result save failed")
+                        results["failed"] += 1
+                        results["results"].append({
+                            "filename": filename,
+                            "status": "failed",
+                            "error": "Result save failed",
+                            "job_id": result.get('job_id')
+                        })
                 else:
-                    logger.error(f"[{filename}] Result save failed")
+                    logger.error(f"[{filename}] Job failed: {result.get('error', 'Unknown error')}")
+                    journal.record(item_key, image_hash, params, filename, "failed",
+                                   job_id=result.get('job_id'), error=str(result.get('error', 'Unknown error')))
                     results["failed"] += 1
                     results["results"].append({
                         "filename": filename,
                         "status": "failed",
-                        "error": "Result save failed",
+                        "error": result.get('error', 'Unknown error'),
                         "job_id": result.get('job_id')
                     })
-            else:
-                logger.error(f"[{filename}] Job failed: {result.get('error', 'Unknown error')}")
-                results["failed"] += 1
-                results["results"].append({
-                    "filename": filename,
-                    "status": "failed",
-                    "error": result.get('error', 'Unknown error'),
-                    "job_id": result.get('job_id')
-                })
-            
-            logger.info(f"==================== Processing completed: {filename} ====================")
+                
+                logger.info(f"==================== Processing completed: {filename} ====================")
+        finally:
+            journal.close()
         
-        logger.info(f"\n🎉 Batch processing completed: {results['successful']}/{results['total_files']} successful")
+        logger.info(f"\n🎉 Batch processing completed: {results['successful']}/{results['total_files']} successful ({results['reused']} reused)")
         return results
 
 
@@ -9,16 +9,178 @@ import uuid
 import logging
 import urllib.request
 import urllib.parse
+import urllib.error
 import binascii
 import subprocess
 import time
+import struct
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from comfy_pool import BackendPool
+from residency import ResidencyManager
+from workflow import (
+    normalize_lora_pairs,
+    lora_set_key,
+    apply_loras,
+    apply_preset,
+    apply_upscale,
+    apply_interpolation,
+    apply_external_encoding,
+    apply_text_cache,
+    apply_latent_cache,
+    apply_split_checkpoints,
+    DEFAULT_PRESET,
+    ENCODE_MODES,
+)
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 server_address = os.getenv('SERVER_ADDRESS', '127.0.0.1')
-client_id = str(uuid.uuid4())
+# One ComfyUI instance per GPU (exported by entrypoint.sh)
+comfyui_ports = os.getenv('COMFYUI_PORTS', '8188')
+comfyui_output_dirs = os.getenv('COMFYUI_OUTPUT_DIRS', '/ComfyUI/output')
+health_check_interval = float(os.getenv('HEALTH_CHECK_INTERVAL', '10'))
+# Max consecutive jobs with the same LoRA set before an older waiting job gets its turn
+lora_affinity_max_run = int(os.getenv('LORA_AFFINITY_MAX_RUN', '8'))
+
+
+# Upscale stage: model directory, default model and frames per upscale batch
+upscale_models_dir = os.getenv('UPSCALE_MODELS_DIR', '/ComfyUI/models/upscale_models')
+default_upscale_model = os.getenv('UPSCALE_MODEL', '')
+upscale_batch_size = int(os.getenv('UPSCALE_BATCH_SIZE', '16'))
+
+# Frame interpolation node: rife (ComfyUI-Frame-Interpolation) or blend (dasiwa_nodes)
+default_interpolation_method = os.getenv('INTERPOLATION_METHOD', 'rife')
+
+# Latent previews: frames kept in the rolling buffer and min seconds between streamed updates
+preview_buffer_size = int(os.getenv('PREVIEW_BUFFER_SIZE', '8'))
+preview_stream_interval = float(os.getenv('PREVIEW_STREAM_INTERVAL', '2'))
+
+# ComfyUI binary WebSocket event types (server.BinaryEventTypes)
+PREVIEW_IMAGE = 1
+PREVIEW_IMAGE_WITH_METADATA = 4
+PREVIEW_MIME_TYPES = {1: "image/jpeg", 2: "image/png"}
+
+
+def decode_preview_frame(data):
+    """Decode a ComfyUI binary WebSocket message into (mime_type, image_bytes), or None"""
+    if len(data) < 8:
+        return None
+    event = struct.unpack(">I", data[:4])[0]
+    if event == PREVIEW_IMAGE:
+        image_type = struct.unpack(">I", data[4:8])[0]
+        return PREVIEW_MIME_TYPES.get(image_type, "image/jpeg"), data[8:]
+    if event == PREVIEW_IMAGE_WITH_METADATA:
+        metadata_length = struct.unpack(">I", data[4:8])[0]
+        metadata = json.loads(data[8:8 + metadata_length])
+        return metadata.get("image_type", "image/jpeg"), data[8 + metadata_length:]
+    return None
+
+
+class PreviewCollector:
+    """Rolling buffer of low-res latent previews, optionally streamed as job progress"""
+
+    def __init__(self, job=None, max_frames=preview_buffer_size, stream_interval=preview_stream_interval):
+        self.job = job
+        self.frames = deque(maxlen=max(max_frames, 1))
+        self.stream_interval = stream_interval
+        self.received = 0
+        self._last_stream = 0.0
+
+    def add(self, data):
+        try:
+            decoded = decode_preview_frame(data)
+        except (ValueError, struct.error) as e:
+            logger.warning(f"Failed to decode preview frame: {e}")
+            return
+        if decoded is None:
+            return
+        mime_type, image_bytes = decoded
+        self.frames.append((mime_type, image_bytes))
+        self.received += 1
+
+        now = time.time()
+        if self.job is not None and now - self._last_stream >= self.stream_interval:
+            self._last_stream = now
+            runpod.serverless.progress_update(self.job, {
+                "preview": base64.b64encode(image_bytes).decode('utf-8'),
+                "preview_mime_type": mime_type,
+                "preview_index": self.received,
+            })
+
+    def strip(self):
+        """Base64 previews in arrival order (oldest first)"""
+        return [base64.b64encode(image_bytes).decode('utf-8') for _, image_bytes in self.frames]
+
+
+# Video encoding: "graph" (VHS_VideoCombine in ComfyUI) or "external" (raw frames + ffmpeg
+# in the handler, so ComfyUI can start the next prompt while this one is encoding)
+default_encode_mode = os.getenv('ENCODE_MODE', 'graph')
+encode_workers = int(os.getenv('ENCODE_WORKERS', '2'))
+encode_dir = os.getenv('ENCODE_DIR', '/tmp/dasiwa_encode')
+ffmpeg_binary = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+
+
+def resolve_ffmpeg(binary):
+    """System ffmpeg if on PATH, else the imageio-ffmpeg binary (as VHS_VideoCombine uses), else None"""
+    path = shutil.which(binary)
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+ffmpeg_path = resolve_ffmpeg(ffmpeg_binary)
+if ffmpeg_path is None and default_encode_mode == "external":
+    raise Exception(f"ENCODE_MODE=external needs ffmpeg: '{ffmpeg_binary}' is not on PATH and imageio-ffmpeg is not installed")
+encode_executor = ThreadPoolExecutor(max_workers=max(encode_workers, 1), thread_name_prefix="encode")
+
+# Persistent text-conditioning cache on the volume (shared by workers)
+text_cache_enabled = os.getenv('TEXT_CACHE', '1') == '1'
+text_cache_dir = os.getenv('TEXT_CACHE_DIR', '/runpod-volume/cache/text_conditioning')
+text_cache_max_mb = int(os.getenv('TEXT_CACHE_MAX_MB', '2048'))
+
+# Start-image latent cache: in-memory tier inside ComfyUI plus disk tier on the volume
+latent_cache_enabled = os.getenv('LATENT_CACHE', '1') == '1'
+latent_cache_dir = os.getenv('LATENT_CACHE_DIR', '/runpod-volume/cache/start_latents')
+latent_cache_max_mb = int(os.getenv('LATENT_CACHE_MAX_MB', '4096'))
+latent_cache_memory_mb = int(os.getenv('LATENT_CACHE_MEMORY_MB', '512'))
+
+# Diffusion-model-only files written by builder/split_checkpoint.py (<checkpoint>-dit.safetensors)
+split_models_dirs = os.getenv('SPLIT_MODELS_DIRS', '/ComfyUI/models/diffusion_models,/runpod-volume/models').split(',')
+SPLIT_SUFFIX = "-dit"
+
+# UI outputs of caching nodes, reported as hit/miss counters in job metrics
+CACHE_UI_KEYS = ("text_cache", "latent_cache")
+
+backend_pool = BackendPool.from_env(
+    server_address, comfyui_ports, comfyui_output_dirs, lora_affinity_max_run, health_check_interval
+)
+
+# Residency policy: full /free after N idle seconds (0 = never, the default - it drops the experts
+# from RAM), defragment threshold
+# (reserved-but-unused share of VRAM, 0 = off) checked once an instance has been idle
+# for RESIDENCY_DEFRAGMENT_IDLE_SECONDS, text encoder placement (gpu/cpu)
+residency = ResidencyManager(
+    backend_pool,
+    idle_free_seconds=float(os.getenv('RESIDENCY_IDLE_FREE_SECONDS', '0')),
+    fragmentation_threshold=float(os.getenv('RESIDENCY_FRAGMENTATION_THRESHOLD', '0')),
+    defragment_idle_seconds=float(os.getenv('RESIDENCY_DEFRAGMENT_IDLE_SECONDS', '15')),
+    text_encoder=os.getenv('RESIDENCY_TEXT_ENCODER', 'gpu'),
+)
+
+# Number of jobs the worker accepts at once (each ComfyUI instance samples one prompt at a time).
+# External encoding needs one extra slot: a job still encoding in the handler must not keep
+# RunPod from handing out the next one (the per-backend scheduler still serializes sampling).
+default_max_concurrency = len(backend_pool.backends) + (1 if default_encode_mode == "external" else 0)
+max_concurrency = int(os.getenv('MAX_CONCURRENCY', str(default_max_concurrency)))
 
 
 def to_nearest_multiple_of_16(value):
@@ -86,8 +248,8 @@ def save_base64_to_file(base64_data, temp_dir, output_filename):
         raise Exception(f"Base64 decoding failed: {e}")
 
 
-def queue_prompt(prompt):
-    url = f"http://{server_address}:8188/prompt"
+def queue_prompt(prompt, client_id, address):
+    url = f"http://{address}/prompt"
     logger.info(f"Queueing prompt to: {url}")
     p = {"prompt": prompt, "client_id": client_id}
     data = json.dumps(p).encode('utf-8')
@@ -95,30 +257,43 @@ def queue_prompt(prompt):
     return json.loads(urllib.request.urlopen(req).read())
 
 
-def get_history(prompt_id):
-    url = f"http://{server_address}:8188/history/{prompt_id}"
+def get_history(prompt_id, address):
+    url = f"http://{address}/history/{prompt_id}"
     logger.info(f"Getting history from: {url}")
     with urllib.request.urlopen(url) as response:
         return json.loads(response.read())
 
 
-def get_videos(ws, prompt):
-    prompt_id = queue_prompt(prompt)['prompt_id']
+def get_videos(ws, prompt, client_id, address, previews=None):
+    prompt_id = queue_prompt(prompt, client_id, address)['prompt_id']
     output_videos = {}
+    # Nodes ComfyUI served from its own cache (their history ui output is from an earlier run)
+    cached_nodes = set()
     while True:
         out = ws.recv()
         if isinstance(out, str):
             message = json.loads(out)
-            if message['type'] == 'executing':
+            if message['type'] == 'execution_cached' and message['data'].get('prompt_id') == prompt_id:
+                cached_nodes.update(message['data'].get('nodes', []))
+            elif message['type'] == 'executing':
                 data = message['data']
                 if data['node'] is None and data['prompt_id'] == prompt_id:
                     break
-        else:
-            continue
+        elif previews is not None:
+            previews.add(out)
 
-    history = get_history(prompt_id)[prompt_id]
+    history = get_history(prompt_id, address)[prompt_id]
+    cache_metrics = {}
     for node_id in history['outputs']:
         node_output = history['outputs'][node_id]
+        for cache_name in CACHE_UI_KEYS:
+            for entry in node_output.get(cache_name, []):
+                counters = cache_metrics.setdefault(cache_name, {"hits": 0, "misses": 0, "node_cached": 0})
+                if node_id in cached_nodes:
+                    # Not re-run: neither the disk cache nor the encoder was used for this job
+                    counters["node_cached"] += 1
+                else:
+                    counters["hits" if entry.get("hit") else "misses"] += 1
         videos_output = []
         if 'gifs' in node_output:
             for video in node_output['gifs']:
@@ -130,9 +305,153 @@ def get_videos(ws, prompt):
                     logger.info(f"Cleaned up video file: {video['fullpath']}")
                 except OSError as e:
                     logger.warning(f"Failed to delete video file {video['fullpath']}: {e}")
+        if 'raw_frames' in node_output:
+            # Move raw frames out of the output dir before it is cleaned; encoded later
+            os.makedirs(encode_dir, exist_ok=True)
+            for raw in node_output['raw_frames']:
+                raw_path = os.path.join(encode_dir, f"{uuid.uuid4()}.rgb")
+                shutil.move(raw['fullpath'], raw_path)
+                videos_output.append(dict(raw, fullpath=raw_path))
         output_videos[node_id] = videos_output
 
-    return output_videos
+    return output_videos, cache_metrics
+
+
+def encode_raw_video(raw, settings):
+    """Encode a raw rgb24 frame file with ffmpeg and return the MP4 as base64"""
+    output_path = os.path.splitext(raw['fullpath'])[0] + ".mp4"
+    command = [
+        ffmpeg_path, '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', raw['pix_fmt'],
+        '-s', f"{raw['width']}x{raw['height']}", '-r', str(raw['frame_rate']),
+        '-i', raw['fullpath'],
+        '-c:v', 'libx264', '-crf', str(settings['crf']), '-pix_fmt', settings['pix_fmt'],
+        '-movflags', '+faststart',
+        output_path,
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"ffmpeg encoding failed: {result.stderr}")
+        with open(output_path, 'rb') as f:
+            return base64.b64encode(f.read()).decode('utf-8')
+    finally:
+        for path in (raw['fullpath'], output_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def encode_raw_outputs(videos, settings):
+    """Encode raw frame outputs in the encode pool; returns videos with base64 MP4s"""
+    futures = {
+        node_id: [encode_executor.submit(encode_raw_video, raw, settings) for raw in items]
+        for node_id, items in videos.items()
+    }
+    return {node_id: [future.result() for future in items] for node_id, items in futures.items()}
+
+
+def find_upscale_model(model_name=None, pick_any=True):
+    """Return the upscale model file to use, or None to fall back to a classical resize
+
+    Without a model name (job input or UPSCALE_MODEL) the first available model
+    is used only if pick_any is set.
+    """
+    model_name = model_name or default_upscale_model
+    try:
+        available = sorted(
+            f for f in os.listdir(upscale_models_dir)
+            if f.lower().endswith(('.pth', '.pt', '.safetensors'))
+        )
+    except OSError:
+        available = []
+    if model_name:
+        if model_name in available:
+            return model_name
+        logger.warning(f"Upscale model not found: {model_name}, using lanczos resize")
+        return None
+    return available[0] if available and pick_any else None
+
+
+def find_split_checkpoints(prompt):
+    """Map checkpoint nodes 1/2 to their split diffusion model files, where those exist"""
+    unet_names = {}
+    for node_id in ("1", "2"):
+        stem = os.path.splitext(prompt[node_id]["inputs"]["ckpt_name"])[0]
+        unet_name = f"{stem}{SPLIT_SUFFIX}.safetensors"
+        if any(os.path.isfile(os.path.join(d.strip(), unet_name)) for d in split_models_dirs if d.strip()):
+            unet_names[node_id] = unet_name
+    return unet_names
+
+
+def clean_output_dir(output_dir):
+    try:
+        if os.path.exists(output_dir):
+            for filename in os.listdir(output_dir):
+                file_path = os.path.join(output_dir, filename)
+                try:
+                    if os.path.isfile(file_path):
+                        os.unlink(file_path)
+                    elif os.path.isdir(file_path):
+                        shutil.rmtree(file_path)
+                except Exception as e:
+                    logger.warning(f"Failed to remove {file_path}: {e}")
+    except Exception as e:
+        logger.warning(f"Failed to clean output directory: {e}")
+
+
+def run_on_backend(backend, prompt, client_id, lora_key, previews):
+    """Connect to one ComfyUI backend and generate the video there"""
+    logger.info(f"Connecting to ComfyUI at {backend.http_url}")
+
+    # WebSocket connection (fail over quickly when other backends exist)
+    ws = websocket.WebSocket()
+    max_attempts = 36 if len(backend_pool.backends) == 1 else 3
+    for attempt in range(max_attempts):
+        try:
+            ws.connect(backend.ws_url(client_id))
+            logger.info(f"WebSocket connection successful (attempt {attempt+1})")
+            break
+        except Exception as e:
+            logger.warning(f"WebSocket connection failed (attempt {attempt+1}/{max_attempts}): {e}")
+            if attempt == max_attempts - 1:
+                raise ConnectionError("WebSocket connection timeout")
+            time.sleep(5)
+
+    # Generate video (jobs sharing the loaded LoRA set go first)
+    backend.scheduler.acquire(lora_key)
+    try:
+        residency.before_job(backend)
+        videos, cache_metrics = get_videos(ws, prompt, client_id, backend.address, previews)
+        # Clean outputs while no other job can be running in this ComfyUI instance
+        clean_output_dir(backend.output_dir)
+        metrics = {"backend": backend.address, "residency": residency.after_job(backend)}
+        metrics.update(cache_metrics)
+    finally:
+        backend.scheduler.release()
+        ws.close()
+    return videos, metrics
+
+
+def generate_videos(prompt, client_id, lora_key, previews):
+    """Run the prompt on the least-loaded healthy backend, failing over on connection errors"""
+    failed = []
+    while True:
+        backend = backend_pool.acquire(lora_key, exclude=failed)
+        try:
+            return run_on_backend(backend, prompt, client_id, lora_key, previews)
+        except urllib.error.HTTPError:
+            # ComfyUI answered (e.g. prompt validation error) - not a backend failure
+            raise
+        except (ConnectionError, TimeoutError, urllib.error.URLError, websocket.WebSocketException) as e:
+            backend_pool.mark_unhealthy(backend)
+            failed.append(backend)
+            if len(failed) >= len(backend_pool.backends):
+                raise Exception(f"All ComfyUI backends failed: {e}")
+            logger.warning(f"ComfyUI backend {backend.address} failed ({e}), failing over")
+        finally:
+            backend_pool.release(backend)
 
 
 def load_workflow(workflow_path):
@@ -155,6 +474,7 @@ def handler(job):
     logger.info(f"Received job input: {job_input_log}")
 
     task_id = f"task_{uuid.uuid4()}"
+    client_id = str(uuid.uuid4())
     temp_dirs_created = set()
 
     # Process image input
@@ -176,12 +496,19 @@ def handler(job):
     logger.info(f"Loading DaSiWa I2V workflow: {workflow_file}")
     prompt = load_workflow(workflow_file)
 
+    # Nodes 1/2: use split diffusion-model-only files when available (smaller reads from the volume)
+    unet_names = find_split_checkpoints(prompt)
+    if unet_names:
+        apply_split_checkpoints(prompt, unet_names)
+        logger.info(f"Using split diffusion models: {unet_names}")
+
     # === DaSiWa Settings ===
     # Defaults from DaSiWa documentation
     width = job_input.get("width", 528)
     height = job_input.get("height", 768)
     length = job_input.get("length", 81)  # 81 frames = ~5 seconds at 16fps
-    steps = job_input.get("steps", 4)  # DaSiWa: 4 steps
+    preset_name = job_input.get("preset", DEFAULT_PRESET)  # standard = DaSiWa 4 steps
+    steps = job_input.get("steps")  # Overrides the preset step count
     cfg = job_input.get("cfg", 1.0)  # DaSiWa: CFG 1
     seed = job_input.get("seed", -1)
     fps = job_input.get("fps", 16)
@@ -209,6 +536,13 @@ def handler(job):
     negative_prompt = job_input.get("negative_prompt", prompt["6"]["inputs"]["text"])
     prompt["6"]["inputs"]["text"] = negative_prompt
     
+    # Node 4: Text encoder placement (residency policy)
+    prompt["4"]["inputs"]["device"] = residency.text_encoder_device
+
+    # Nodes 5/6: persistent text-conditioning cache (UMT5 is only loaded on a miss)
+    if text_cache_enabled:
+        apply_text_cache(prompt, text_cache_dir, text_cache_max_mb)
+
     # Node 7: Load image
     prompt["7"]["inputs"]["image"] = image_path
     
@@ -216,60 +550,77 @@ def handler(job):
     prompt["8"]["inputs"]["width"] = adjusted_width
     prompt["8"]["inputs"]["height"] = adjusted_height
     prompt["8"]["inputs"]["length"] = length
+
+    # Node 8: cache the VAE-encoded start image (skips the encode pass on a hit)
+    if latent_cache_enabled:
+        apply_latent_cache(prompt, latent_cache_dir, latent_cache_max_mb, latent_cache_memory_mb)
     
+    # Nodes 11/12: steps, HIGH/LOW split, sampler and model patches from the preset
+    preset = apply_preset(prompt, preset_name, steps)
+    steps = preset["steps"]
+
     # Node 11: KSampler High
     prompt["11"]["inputs"]["noise_seed"] = seed
-    prompt["11"]["inputs"]["steps"] = steps
     prompt["11"]["inputs"]["cfg"] = cfg
-    prompt["11"]["inputs"]["end_at_step"] = steps // 2  # Half steps for HIGH
     
     # Node 12: KSampler Low
     prompt["12"]["inputs"]["noise_seed"] = seed
-    prompt["12"]["inputs"]["steps"] = steps
     prompt["12"]["inputs"]["cfg"] = cfg
-    prompt["12"]["inputs"]["start_at_step"] = steps // 2  # Start from half for LOW
     
     # Node 14: Video output
     prompt["14"]["inputs"]["frame_rate"] = fps
 
-    logger.info(f"DaSiWa settings: {adjusted_width}x{adjusted_height}, {length} frames, {steps} steps, CFG {cfg}, {fps} fps")
-
-    # === Connect to ComfyUI ===
-    ws_url = f"ws://{server_address}:8188/ws?clientId={client_id}"
-    http_url = f"http://{server_address}:8188/"
-    
-    logger.info(f"Connecting to ComfyUI at {http_url}")
-
-    # HTTP connection check
-    max_http_attempts = 180
-    for http_attempt in range(max_http_attempts):
-        try:
-            response = urllib.request.urlopen(http_url, timeout=5)
-            logger.info(f"HTTP connection successful (attempt {http_attempt+1})")
-            break
-        except Exception as e:
-            logger.warning(f"HTTP connection failed (attempt {http_attempt+1}/{max_http_attempts}): {e}")
-            if http_attempt == max_http_attempts - 1:
-                raise Exception("Cannot connect to ComfyUI server.")
-            time.sleep(1)
-
-    # WebSocket connection
-    ws = websocket.WebSocket()
-    max_attempts = 36
-    for attempt in range(max_attempts):
-        try:
-            ws.connect(ws_url)
-            logger.info(f"WebSocket connection successful (attempt {attempt+1})")
-            break
-        except Exception as e:
-            logger.warning(f"WebSocket connection failed (attempt {attempt+1}/{max_attempts}): {e}")
-            if attempt == max_attempts - 1:
-                raise Exception("WebSocket connection timeout")
-            time.sleep(5)
-
-    # Generate video
-    videos = get_videos(ws, prompt)
-    ws.close()
+    # Upscale: sample at a reduced resolution, upscale decoded frames before node 14
+    # A preset default (draft) never auto-picks a model: a 4x model on every frame can cost
+    # more than the lower sampling resolution saves, so it uses lanczos unless one is named
+    upscale = float(job_input.get("upscale", preset["upscale"]))
+    if upscale > 1:
+        upscale_model = find_upscale_model(job_input.get("upscale_model"), pick_any="upscale" in job_input)
+        internal_width, internal_height = apply_upscale(
+            prompt, adjusted_width, adjusted_height, upscale, upscale_model, upscale_batch_size
+        )
+        logger.info(f"Upscale x{upscale}: sampling at {internal_width}x{internal_height}, "
+                    f"upscaling with {upscale_model or 'lanczos'} to {adjusted_width}x{adjusted_height}")
+
+    # Interpolation: synthesize in-between frames and raise the node 14 frame rate
+    interpolate = int(job_input.get("interpolate", 1))
+    if interpolate > 1:
+        interpolation_method = job_input.get("interpolation_method", default_interpolation_method)
+        fps = apply_interpolation(prompt, interpolate, interpolation_method)
+        logger.info(f"Interpolation x{interpolate} ({interpolation_method}): "
+                    f"{length} sampled frames -> {(length - 1) * interpolate + 1} frames at {fps} fps")
+
+    # Encoding: external mode swaps node 14 for a raw frame sink, encoded by the handler
+    encode_mode = job_input.get("encode_mode", default_encode_mode)
+    if encode_mode not in ENCODE_MODES:
+        raise Exception(f"Unknown encode mode: {encode_mode} (available: {', '.join(ENCODE_MODES)})")
+    if encode_mode == "external":
+        if ffmpeg_path is None:
+            raise Exception(f"External encoding needs ffmpeg: '{ffmpeg_binary}' is not on PATH and imageio-ffmpeg is not installed")
+        encode_settings = apply_external_encoding(prompt)
+
+    # LoRA loaders after checkpoints 1 (HIGH) and 2 (LOW)
+    lora_pairs = normalize_lora_pairs(job_input.get("lora_pairs"))
+    lora_key = lora_set_key(lora_pairs)
+    if lora_pairs:
+        apply_loras(prompt, lora_pairs)
+        logger.info(f"LoRA set ({len(lora_pairs)} pairs): {lora_pairs}")
+
+    logger.info(f"DaSiWa settings: preset {preset_name}, {adjusted_width}x{adjusted_height}, {length} frames, {steps} steps (HIGH {preset['split']}), {preset['sampler']}/{preset['scheduler']}, CFG {cfg}, {fps} fps")
+
+    # Latent previews from binary WebSocket frames (no extra VAE pass)
+    return_previews = job_input.get("return_previews", False)
+    stream_preview = job_input.get("stream_preview", False)
+    previews = PreviewCollector(job if stream_preview else None)
+
+    # Generate video on the least-loaded ComfyUI instance
+    videos, metrics = generate_videos(prompt, client_id, lora_key, previews)
+
+    # External encoding runs after ComfyUI is released, overlapping the next job's sampling
+    if encode_mode == "external":
+        encode_start = time.time()
+        videos = encode_raw_outputs(videos, encode_settings)
+        metrics["encode_seconds"] = round(time.time() - encode_start, 2)
 
     # Cleanup
     logger.info("=" * 80)
@@ -283,27 +634,23 @@ def handler(job):
         except Exception as e:
             logger.warning(f"Failed to clean up {temp_dir}: {e}")
 
-    output_dir = "/ComfyUI/output"
-    try:
-        if os.path.exists(output_dir):
-            for filename in os.listdir(output_dir):
-                file_path = os.path.join(output_dir, filename)
-                try:
-                    if os.path.isfile(file_path):
-                        os.unlink(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
-                except Exception as e:
-                    logger.warning(f"Failed to remove {file_path}: {e}")
-    except Exception as e:
-        logger.warning(f"Failed to clean output directory: {e}")
-
     # Return result
     for node_id in videos:
         if videos[node_id]:
-            return {"video": videos[node_id][0]}
+            result = {"video": videos[node_id][0], "metrics": metrics}
+            if return_previews:
+                result["previews"] = previews.strip()
+            return result
 
     return {"error": "Video not found."}
 
 
-runpod.serverless.start({"handler": handler})
+async def async_handler(job):
+    """Run the blocking handler in a thread so several jobs can be accepted concurrently"""
+    return await asyncio.to_thread(handler, job)
+
+
+runpod.serverless.start({
+    "handler": async_handler,
+    "concurrency_modifier": lambda current_concurrency: max_concurrency,
+})
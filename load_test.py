@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Endpoint load test and latency profiler built on GenerateVideoClient
+Replays a workload file at a target arrival rate and reports per-job queue
+delay, execution and transfer times, p50/p95/p99, throughput and cold starts
+as JSON and HTML.
+
+Cold starts come from the endpoint when it reports them (fake_runpod_server.py
+does; RunPod does not). Otherwise a job is counted as cold when it is the first
+one on its worker, or its worker had been idle longer than the scale-down
+timeout, and its queue delay is well above that of jobs on warm workers.
+
+Workload file example:
+    {
+        "arrival_rate": 0.2,          # jobs per second
+        "arrival": "poisson",         # or "uniform"
+        "jobs": 20,
+        "seed": 1,
+        "mix": [
+            {"name": "portrait_5s", "weight": 3, "image_file": "./example_image.png",
+             "input": {"prompt": "woman dancing", "width": 528, "height": 768, "length": 81}},
+            {"name": "url_720p", "weight": 1,
+             "input": {"prompt": "running man", "image_url": "https://example.com/image.jpg",
+                       "width": 720, "height": 1280, "length": 49}}
+        ]
+    }
+
+Usage:
+    python load_test.py --workload workload.json --endpoint-id <id> --api-key <key>
+    python load_test.py --workload workload.json --base-url http://127.0.0.1:8000/v2   # fake_runpod_server.py
+"""
+
+import argparse
+import html
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from generate_video_client import GenerateVideoClient
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LATENCY_METRICS = ("end_to_end", "submit_transfer", "queue_delay", "execution", "result_transfer", "poll_overhead")
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Linear-interpolated percentile (p in 0..100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def arrival_offsets(count: int, rate: float, arrival: str, rng: random.Random) -> List[float]:
+    """Submission times (seconds from start) for count jobs at rate jobs/second"""
+    offsets = []
+    t = 0.0
+    for _ in range(count):
+        offsets.append(t)
+        t += rng.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+    return offsets
+
+
+class LoadTest:
+    def __init__(
+        self,
+        client: GenerateVideoClient,
+        workload: Dict[str, Any],
+        max_check_interval: float = 2.0,
+        cold_start_threshold: Optional[float] = None,
+        worker_idle_timeout: float = 5.0
+    ):
+        """
+        Initialize load test
+
+        Args:
+            client: GenerateVideoClient pointed at the endpoint (or a local stand-in)
+            workload: Parsed workload file
+            max_check_interval: Upper bound of the adaptive status polling interval (seconds)
+            cold_start_threshold: Queue delay (seconds) above which a job on a new or idle worker counts
+                as a cold start; None = twice the median queue delay on warm workers (at least 1 s)
+            worker_idle_timeout: Idle seconds after which a worker is assumed to have scaled down
+        """
+        self.client = client
+        self.workload = workload
+        self.max_check_interval = max_check_interval
+        self.cold_start_threshold = cold_start_threshold
+        self.worker_idle_timeout = worker_idle_timeout
+        self.records = []
+        self._lock = threading.Lock()
+        self._encoded_images = {}
+
+    def _build_input(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        input_data = dict(entry.get("input", {}))
+        image_file = entry.get("image_file")
+        if image_file:
+            # Encode each image file once, not once per job
+            with self._lock:
+                if image_file not in self._encoded_images:
+                    self._encoded_images[image_file] = self.client.encode_file_to_base64(image_file)
+                input_data["image_base64"] = self._encoded_images[image_file]
+        return input_data
+
+    def _run_job(self, index: int, entry: Dict[str, Any], scheduled_at: float):
+        record = {"index": index, "name": entry.get("name", f"mix_{index}"), "scheduled_at": scheduled_at}
+        input_data = self._build_input(entry)
+
+        submit_start = time.time()
+        job_id = self.client.submit_job(input_data)
+        submitted_at = time.time()
+        record["submit_transfer"] = submitted_at - submit_start
+
+        if not job_id:
+            record["status"] = "SUBMIT_FAILED"
+        else:
+            record["job_id"] = job_id
+            result = self.client.wait_for_completion(job_id, check_interval=self.max_check_interval)
+            finished_at = time.time()
+            record["status"] = result.get("status")
+            record["end_to_end"] = finished_at - submit_start
+
+            timings = result.get("timings") or {}
+            if timings.get("delay_ms") is not None:
+                record["queue_delay"] = timings["delay_ms"] / 1000.0
+            if timings.get("execution_ms") is not None:
+                record["execution"] = timings["execution_ms"] / 1000.0
+            if timings.get("last_poll_seconds") is not None:
+                record["result_transfer"] = timings["last_poll_seconds"]
+            record["polls"] = timings.get("polls")
+            record["worker_id"] = timings.get("worker_id")
+            record["cold_start_reported"] = timings.get("cold_start")
+            # Approximate worker-side start/end on the client clock, for per-worker idle gaps
+            if "queue_delay" in record:
+                record["started_at"] = submitted_at + record["queue_delay"]
+                record["ended_at"] = record["started_at"] + record.get("execution", 0.0)
+
+            # Time between the job finishing on the worker and the client noticing it
+            if "queue_delay" in record and "execution" in record:
+                record["poll_overhead"] = max(
+                    record["end_to_end"] - record["submit_transfer"] - record["queue_delay"]
+                    - record["execution"] - record.get("result_transfer", 0.0), 0.0
+                )
+
+        with self._lock:
+            self.records.append(record)
+        logger.info(f"[{index}] {record['name']}: {record['status']} "
+                    f"(end-to-end {record.get('end_to_end', 0.0):.1f}s)")
+
+    def run(self, jobs: Optional[int] = None, rate: Optional[float] = None) -> Dict[str, Any]:
+        """Replay the workload and return the report"""
+        rng = random.Random(self.workload.get("seed"))
+        mix = self.workload["mix"]
+        weights = [entry.get("weight", 1) for entry in mix]
+        jobs = jobs or self.workload.get("jobs", 10)
+        rate = rate or self.workload.get("arrival_rate", 0.1)
+        arrival = self.workload.get("arrival", "poisson")
+        offsets = arrival_offsets(jobs, rate, arrival, rng)
+
+        logger.info(f"Starting load test: {jobs} jobs at {rate} jobs/s ({arrival} arrivals)")
+        start = time.time()
+        threads = []
+        for index, offset in enumerate(offsets):
+            delay = start + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            entry = rng.choices(mix, weights=weights)[0]
+            thread = threading.Thread(target=self._run_job, args=(index, entry, offset), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        duration = time.time() - start
+
+        return self.report(duration, {"jobs": jobs, "arrival_rate": rate, "arrival": arrival})
+
+    def mark_cold_starts(self, records: List[Dict[str, Any]]) -> Optional[float]:
+        """Set cold_start/cold_start_source on every record; returns the inference threshold used"""
+        # Jobs whose worker was new or idle past the scale-down timeout when they started
+        candidates = set()
+        last_end = {}
+        for record in sorted((r for r in records if "started_at" in r), key=lambda r: r["started_at"]):
+            worker_id = record.get("worker_id")
+            previous_end = last_end.get(worker_id)
+            if worker_id is None or previous_end is None or record["started_at"] - previous_end > self.worker_idle_timeout:
+                candidates.add(record["index"])
+            if worker_id is not None:
+                last_end[worker_id] = max(previous_end or 0.0, record["ended_at"])
+
+        threshold = self.cold_start_threshold
+        if threshold is None:
+            warm_delays = [r["queue_delay"] for r in records if "queue_delay" in r and r["index"] not in candidates]
+            threshold = max(2 * percentile(warm_delays, 50), 1.0) if warm_delays else 1.0
+
+        for record in records:
+            if record.get("cold_start_reported") is not None:
+                record["cold_start"] = bool(record["cold_start_reported"])
+                record["cold_start_source"] = "endpoint"
+            else:
+                record["cold_start"] = record["index"] in candidates and record.get("queue_delay", 0.0) > threshold
+                record["cold_start_source"] = "inferred"
+        return threshold
+
+    def report(self, duration: float, config: Dict[str, Any]) -> Dict[str, Any]:
+        records = sorted(self.records, key=lambda r: r["index"])
+        threshold = self.mark_cold_starts(records)
+        completed = [r for r in records if r.get("status") == "COMPLETED"]
+        latency = {}
+        for metric in LATENCY_METRICS:
+            values = [r[metric] for r in completed if r.get(metric) is not None]
+            if values:
+                latency[metric] = {
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                    "p99": percentile(values, 99),
+                    "mean": sum(values) / len(values),
+                    "max": max(values),
+                }
+        summary = {
+            "jobs": len(records),
+            "completed": len(completed),
+            "failed": len(records) - len(completed),
+            "duration_seconds": duration,
+            "throughput_jobs_per_min": len(completed) / duration * 60 if duration > 0 else 0.0,
+            "cold_starts": sum(1 for r in records if r.get("cold_start")),
+            "cold_start_threshold_seconds": threshold,
+            "workers_seen": len({r["worker_id"] for r in records if r.get("worker_id")}),
+            "latency_seconds": latency,
+        }
+        return {"config": config, "summary": summary, "jobs": records}
+
+
+def render_html(report: Dict[str, Any]) -> str:
+    """Self-contained HTML report"""
+    summary = report["summary"]
+
+    def fmt(value):
+        if isinstance(value, float):
+            return f"{value:.2f}"
+        return html.escape(str(value)) if value is not None else "-"
+
+    rows = [
+        f"<tr><th>{html.escape(k)}</th><td>{fmt(v)}</td></tr>"
+        for k, v in summary.items() if k != "latency_seconds"
+    ]
+    latency_rows = [
+        f"<tr><th>{html.escape(metric)}</th>" + "".join(f"<td>{fmt(stats[k])}</td>" for k in ("p50", "p95", "p99", "mean", "max")) + "</tr>"
+        for metric, stats in summary["latency_seconds"].items()
+    ]
+    job_columns = ("index", "name", "status", "worker_id", "cold_start", "cold_start_source") + LATENCY_METRICS
+    job_rows = [
+        "<tr>" + "".join(f"<td>{fmt(job.get(column))}</td>" for column in job_columns) + "</tr>"
+        for job in report["jobs"]
+    ]
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>DaSiWa I2V load test</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; margin-bottom: 2em; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 10px; text-align: right; }}
+th {{ background: #f4f4f4; text-align: left; }}
+</style>
+</head>
+<body>
+<h1>DaSiWa I2V load test</h1>
+<p>{html.escape(json.dumps(report["config"]))}</p>
+<h2>Summary</h2>
+<table>{"".join(rows)}</table>
+<h2>Latency (seconds)</h2>
+<table><tr><th>metric</th><th>p50</th><th>p95</th><th>p99</th><th>mean</th><th>max</th></tr>{"".join(latency_rows)}</table>
+<h2>Jobs</h2>
+<table><tr>{"".join(f"<th>{c}</th>" for c in job_columns)}</tr>{"".join(job_rows)}</table>
+</body>
+</html>
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a DaSiWa I2V endpoint")
+    parser.add_argument("--workload", required=True, help="Workload JSON file")
+    parser.add_argument("--endpoint-id", default=os.getenv("RUNPOD_ENDPOINT_ID", "local"))
+    parser.add_argument("--api-key", default=os.getenv("RUNPOD_API_KEY", "local"))
+    parser.add_argument("--base-url", default="https://api.runpod.ai/v2", help="API base URL")
+    parser.add_argument("--jobs", type=int, help="Override number of jobs")
+    parser.add_argument("--rate", type=float, help="Override arrival rate (jobs/s)")
+    parser.add_argument("--max-check-interval", type=float, default=2.0, help="Max status polling interval (s)")
+    parser.add_argument("--cold-start-threshold", type=float,
+                        help="Queue delay (s) counted as cold start on a new/idle worker (default: 2x warm median, min 1s)")
+    parser.add_argument("--worker-idle-timeout", type=float, default=5.0,
+                        help="Endpoint idle timeout (s) after which a worker is assumed to have scaled down")
+    parser.add_argument("--output", default="load_test_report", help="Report path prefix (.json and .html)")
+    args = parser.parse_args()
+
+    with open(args.workload, 'r') as f:
+        workload = json.load(f)
+
+    client = GenerateVideoClient(args.endpoint_id, args.api_key, api_base_url=args.base_url)
+    # Per-poll client logs drown the report at any real arrival rate
+    logging.getLogger("generate_video_client").setLevel(logging.WARNING)
+
+    load_test = LoadTest(client, workload, args.max_check_interval, args.cold_start_threshold, args.worker_idle_timeout)
+    report = load_test.run(args.jobs, args.rate)
+
+    with open(f"{args.output}.json", 'w') as f:
+        json.dump(report, f, indent=2)
+    with open(f"{args.output}.html", 'w') as f:
+        f.write(render_html(report))
+
+    summary = report["summary"]
+    print(f"\nCompleted {summary['completed']}/{summary['jobs']} jobs in {summary['duration_seconds']:.1f}s "
+          f"({summary['throughput_jobs_per_min']:.2f} jobs/min, {summary['cold_starts']} cold starts)")
+    for metric, stats in summary["latency_seconds"].items():
+        print(f"   {metric:16s} p50 {stats['p50']:.2f}s  p95 {stats['p95']:.2f}s  p99 {stats['p99']:.2f}s")
+    print(f"Report: {args.output}.json, {args.output}.html")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+VRAM/RAM residency policy for ComfyUI instances, applied through /system_stats and /free.
+
+ComfyUI handles /free between prompts:
+  {"unload_models": true}                        - move models out of VRAM and empty the CUDA cache
+                                                   (weights stay in RAM, cached node outputs survive)
+  {"unload_models": true, "free_memory": true}   - additionally drop cached node outputs, releasing RAM
+
+Policies:
+  keep-hot       - never free while the instance has queued or in-flight jobs
+  defragment     - once an instance has been idle for a while (after ComfyUI's own post-prompt
+                   GC), unload if reserved-but-unused VRAM exceeds a share of total VRAM (off by default)
+  idle free      - fully free an instance after N idle seconds (off by default: it drops the
+                   experts from RAM, so the next job reloads them from the volume)
+  text encoder   - "cpu" keeps UMT5 off the GPU entirely (CLIPLoader device, applied to the graph)
+"""
+
+import json
+import logging
+import threading
+import time
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+ACTION_NONE = "none"
+ACTION_KEEP_HOT = "keep_hot"
+ACTION_DEFRAGMENT = "defragment"
+ACTION_IDLE_FREE = "idle_free"
+
+TEXT_ENCODER_DEVICES = {"gpu": "default", "cpu": "cpu"}
+
+
+def get_system_stats(address, timeout=5):
+    with urllib.request.urlopen(f"http://{address}/system_stats", timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def post_free(address, unload_models=True, free_memory=False, timeout=5):
+    data = json.dumps({"unload_models": unload_models, "free_memory": free_memory}).encode('utf-8')
+    req = urllib.request.Request(f"http://{address}/free", data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        response.read()
+
+
+def memory_summary(stats):
+    """VRAM/RAM figures (MB) of the first device from a /system_stats response"""
+    mb = 1024 * 1024
+    summary = {"ram_free_mb": stats.get("system", {}).get("ram_free", 0) // mb}
+    devices = stats.get("devices", [])
+    if devices:
+        device = devices[0]
+        summary.update({
+            "vram_total_mb": device.get("vram_total", 0) // mb,
+            "vram_free_mb": device.get("vram_free", 0) // mb,
+            "torch_reserved_mb": device.get("torch_vram_total", 0) // mb,
+            "torch_reserved_free_mb": device.get("torch_vram_free", 0) // mb,
+        })
+    return summary
+
+
+class ResidencyManager:
+    """Applies the residency policy to every backend of a BackendPool"""
+
+    def __init__(self, pool, idle_free_seconds=0, fragmentation_threshold=0.0, defragment_idle_seconds=15,
+                 text_encoder="gpu"):
+        if text_encoder not in TEXT_ENCODER_DEVICES:
+            raise Exception(f"Unknown text encoder residency: {text_encoder} (available: {', '.join(TEXT_ENCODER_DEVICES)})")
+        self.pool = pool
+        self.idle_free_seconds = idle_free_seconds
+        self.fragmentation_threshold = fragmentation_threshold
+        self.defragment_idle_seconds = defragment_idle_seconds
+        self.text_encoder = text_encoder
+        self._lock = threading.Lock()
+        self._last_job_end = {b.address: time.time() for b in pool.backends}
+        self._idle_freed = {b.address: False for b in pool.backends}
+        self._defrag_checked = {b.address: False for b in pool.backends}
+        # Actions taken between jobs, reported with the next job on that backend
+        self._pending = {b.address: [] for b in pool.backends}
+        if idle_free_seconds > 0 or fragmentation_threshold > 0:
+            threading.Thread(target=self._idle_loop, daemon=True).start()
+
+    @property
+    def text_encoder_device(self):
+        return TEXT_ENCODER_DEVICES[self.text_encoder]
+
+    def before_job(self, backend):
+        with self._lock:
+            self._idle_freed[backend.address] = False
+            self._defrag_checked[backend.address] = False
+
+    def after_job(self, backend):
+        """Apply the post-job policy; returns the metrics reported with the job"""
+        with self._lock:
+            self._last_job_end[backend.address] = time.time()
+            report = {"between_jobs": self._pending[backend.address]}
+            self._pending[backend.address] = []
+
+        try:
+            memory = memory_summary(get_system_stats(backend.address))
+        except Exception as e:
+            logger.warning(f"Failed to read /system_stats from {backend.address}: {e}")
+            report["action"] = ACTION_NONE
+            return report
+        report["memory"] = memory
+
+        # in_flight still counts the job that just finished
+        if backend.in_flight > 1 or backend.queue_depth > 1:
+            report["action"] = ACTION_KEEP_HOT
+        else:
+            report["action"] = ACTION_NONE
+        return report
+
+    def _defragment(self, backend):
+        """Unload models if reserved-but-unused VRAM is above the threshold; returns the action or None"""
+        try:
+            memory = memory_summary(get_system_stats(backend.address))
+        except Exception as e:
+            logger.warning(f"Failed to read /system_stats from {backend.address}: {e}")
+            return None
+        reserved_free = memory.get("torch_reserved_free_mb", 0)
+        vram_total = memory.get("vram_total_mb", 0)
+        if not vram_total or reserved_free / vram_total <= self.fragmentation_threshold:
+            return None
+        # A job may have arrived while the stats were read
+        if backend.in_flight > 0:
+            return None
+        try:
+            post_free(backend.address, unload_models=True, free_memory=False)
+        except Exception as e:
+            logger.warning(f"Failed to call /free on {backend.address}: {e}")
+            return None
+        logger.info(f"Residency: defragmenting {backend.address} "
+                    f"({reserved_free}MB of {vram_total}MB reserved but unused)")
+        return {"action": ACTION_DEFRAGMENT, "reserved_free_mb": reserved_free}
+
+    def _idle_loop(self):
+        intervals = [t for t in (self.idle_free_seconds, self.defragment_idle_seconds) if t > 0]
+        while True:
+            time.sleep(min(intervals + [5]))
+            now = time.time()
+            for backend in self.pool.backends:
+                with self._lock:
+                    if backend.in_flight > 0:
+                        continue
+                    idle = now - self._last_job_end[backend.address]
+                    defragment = (self.fragmentation_threshold > 0 and not self._defrag_checked[backend.address]
+                                  and not self._idle_freed[backend.address] and idle >= self.defragment_idle_seconds)
+                    if defragment:
+                        self._defrag_checked[backend.address] = True
+                    idle_free = (self.idle_free_seconds > 0 and not self._idle_freed[backend.address]
+                                 and idle >= self.idle_free_seconds)
+                    if idle_free:
+                        self._idle_freed[backend.address] = True
+
+                if defragment:
+                    action = self._defragment(backend)
+                    if action:
+                        with self._lock:
+                            self._pending[backend.address].append(action)
+                if idle_free:
+                    try:
+                        post_free(backend.address, unload_models=True, free_memory=True)
+                        logger.info(f"Residency: freed {backend.address} after {idle:.0f}s idle")
+                        with self._lock:
+                            self._pending[backend.address].append({"action": ACTION_IDLE_FREE, "idle_seconds": round(idle)})
+                    except Exception as e:
+                        logger.warning(f"Failed to call /free on {backend.address}: {e}")
@@ -0,0 +1,33 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from dasiwa_nodes.interpolation import blend_interpolate
+
+
+def make_frames(count):
+    # Frame i is filled with the value 10 * i
+    return torch.arange(count, dtype=torch.float32).mul(10).view(count, 1, 1, 1).expand(count, 2, 3, 3).contiguous()
+
+
+@pytest.mark.parametrize("multiplier", [2, 3, 4])
+def test_blend_interpolate(multiplier):
+    frames = make_frames(4)
+    out = blend_interpolate(frames, multiplier)
+
+    assert out.shape == ((4 - 1) * multiplier + 1, 2, 3, 3)
+    # Originals at multiples of the multiplier
+    for i in range(4):
+        assert torch.equal(out[i * multiplier], frames[i])
+    # In-between frames are the linear blends of their neighbours
+    for i in range(3):
+        for step in range(1, multiplier):
+            expected = torch.lerp(frames[i], frames[i + 1], step / multiplier)
+            assert torch.allclose(out[i * multiplier + step], expected)
+
+
+def test_blend_interpolate_passthrough():
+    frames = make_frames(3)
+    assert blend_interpolate(frames, 1) is frames
+    single = make_frames(1)
+    assert blend_interpolate(single, 4) is single
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "builder"))
+
+import split_checkpoint  # noqa: E402
+
+
+def write_safetensors(path, tensors, metadata=None):
+    """tensors: name -> (dtype, shape, raw bytes)"""
+    header = {"__metadata__": metadata or {}}
+    data = b""
+    for name, (dtype, shape, raw) in tensors.items():
+        header[name] = {"dtype": dtype, "shape": shape, "data_offsets": [len(data), len(data) + len(raw)]}
+        data += raw
+    header_bytes = json.dumps(header).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)) + header_bytes + data)
+
+
+def read_safetensors(path):
+    with open(path, "rb") as f:
+        header, data_start = split_checkpoint.read_header(f)
+        data = f.read()
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        begin, end = info["data_offsets"]
+        tensors[name] = (info["dtype"], info["shape"], data[begin:end])
+    assert data_start % split_checkpoint.HEADER_ALIGNMENT == 0
+    return header, tensors
+
+
+def f32(*values):
+    return struct.pack(f"<{len(values)}f", *values)
+
+
+def test_split_checkpoint(tmp_path):
+    source = str(tmp_path / "model.safetensors")
+    output = str(tmp_path / "model-dit.safetensors")
+    write_safetensors(source, {
+        "cond_stage_model.encoder.weight": ("F32", [2], f32(1, 2)),
+        "model.diffusion_model.blocks.0.weight": ("F32", [2, 2], f32(1, 2, 3, 4)),
+        "first_stage_model.decoder.weight": ("F32", [1], f32(5)),
+        "model.diffusion_model.blocks.0.bias": ("I64", [1], struct.pack("<q", 7)),
+    }, {"format": "pt"})
+
+    manifest = split_checkpoint.split_checkpoint(source, output)
+
+    header, tensors = read_safetensors(output)
+    assert header["__metadata__"] == {"format": "pt", "split_from": "model.safetensors"}
+    assert tensors == {
+        "blocks.0.weight": ("F32", [2, 2], f32(1, 2, 3, 4)),
+        "blocks.0.bias": ("I64", [1], struct.pack("<q", 7)),
+    }
+    assert header["blocks.0.weight"]["data_offsets"] == [0, 16]
+    assert header["blocks.0.bias"]["data_offsets"] == [16, 24]
+
+    with open(output, "rb") as f:
+        assert manifest["output_sha256"] == hashlib.sha256(f.read()).hexdigest()
+    assert manifest["output_size"] == os.path.getsize(output)
+    assert manifest["tensors"] == 2
+    assert manifest["dtypes"] == {"F32": 1, "I64": 1}
+    assert manifest["skipped"] == {"cond_stage_model": 1, "first_stage_model": 1}
+    assert manifest["cast_to"] is None
+    with open(output + ".manifest.json") as f:
+        assert json.load(f) == manifest
+
+
+def test_split_checkpoint_keep_prefix(tmp_path):
+    source = str(tmp_path / "model.safetensors")
+    output = str(tmp_path / "model-dit.safetensors")
+    write_safetensors(source, {"model.diffusion_model.a": ("F32", [1], f32(1))})
+
+    split_checkpoint.split_checkpoint(source, output, keep_prefix=True)
+
+    _, tensors = read_safetensors(output)
+    assert list(tensors) == ["model.diffusion_model.a"]
+
+
+def test_split_checkpoint_without_prefix_fails(tmp_path):
+    source = str(tmp_path / "model.safetensors")
+    write_safetensors(source, {"a": ("F32", [1], f32(1))})
+    with pytest.raises(Exception, match="No tensors with prefix"):
+        split_checkpoint.split_checkpoint(source, str(tmp_path / "out.safetensors"))
+
+
+def test_split_checkpoint_cast(tmp_path):
+    torch = pytest.importorskip("torch")
+    source = str(tmp_path / "model.safetensors")
+    output = str(tmp_path / "model-dit.safetensors")
+    fp8 = torch.tensor([0.5, -1.0]).to(torch.float8_e4m3fn).view(torch.uint8).numpy().tobytes()
+    write_safetensors(source, {
+        "model.diffusion_model.weight": ("F32", [2, 2], f32(1, 2, 3, 4)),
+        "model.diffusion_model.scalar": ("F32", [], f32(0.25)),
+        "model.diffusion_model.empty": ("F32", [0, 4], b""),
+        "model.diffusion_model.fp8.weight": ("F8_E4M3", [2], fp8),
+        "model.diffusion_model.fp8.scale_weight": ("F32", [1], f32(3)),
+    })
+
+    manifest = split_checkpoint.split_checkpoint(source, output, dtype="fp16")
+
+    _, tensors = read_safetensors(output)
+
+    def fp16(*values):
+        return torch.tensor(values, dtype=torch.float16).view(torch.uint8).numpy().tobytes()
+
+    assert tensors["weight"] == ("F16", [2, 2], fp16(1, 2, 3, 4))
+    assert tensors["scalar"] == ("F16", [], fp16(0.25))
+    # Copied unchanged: empty tensors, fp8 weights and their scales
+    assert tensors["empty"] == ("F32", [0, 4], b"")
+    assert tensors["fp8.weight"] == ("F8_E4M3", [2], fp8)
+    assert tensors["fp8.scale_weight"] == ("F32", [1], f32(3))
+    assert manifest["cast_to"] == "F16"
+    assert manifest["dtypes"] == {"F16": 2, "F32": 2, "F8_E4M3": 1}
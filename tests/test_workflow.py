@@ -0,0 +1,169 @@
+import json
+import os
+
+import pytest
+
+import workflow
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), "..", "dasiwa_i2v_api.json")
+
+
+@pytest.fixture
+def prompt():
+    with open(TEMPLATE, "r") as f:
+        return json.load(f)
+
+
+def assert_refs_exist(prompt):
+    """Every node reference points at a node in the graph"""
+    for node_id, node in prompt.items():
+        for name, value in node["inputs"].items():
+            if isinstance(value, list) and len(value) == 2 and isinstance(value[0], str):
+                assert value[0] in prompt, f"{node_id}.{name} -> missing node {value[0]}"
+
+
+def test_split_steps():
+    assert workflow.split_steps(4, 0.5) == 2
+    assert workflow.split_steps(5, 0.5) == 2
+    # Each expert keeps at least one step
+    assert workflow.split_steps(2, 0.5) == 1
+    assert workflow.split_steps(3, 0.0) == 1
+    assert workflow.split_steps(8, 1.0) == 7
+
+
+def test_draft_preset(prompt):
+    preset = workflow.apply_preset(prompt, "draft")
+    assert preset["steps"] == 2
+    assert preset["split"] == 1
+    assert prompt["11"]["inputs"]["end_at_step"] == 1
+    assert prompt["12"]["inputs"]["start_at_step"] == 1
+    # Attention patch in front of each sampler, after ModelSamplingSD3
+    assert prompt["11"]["inputs"]["model"] == ["120", 0]
+    assert prompt["12"]["inputs"]["model"] == ["130", 0]
+    assert prompt["120"]["class_type"] == "PathchSageAttentionKJ"
+    assert prompt["120"]["inputs"]["sage_attention"] == "auto"
+    assert prompt["120"]["inputs"]["model"] == ["9", 0]
+    assert prompt["130"]["inputs"]["model"] == ["10", 0]
+    assert_refs_exist(prompt)
+
+
+def test_standard_preset_keeps_graph(prompt):
+    preset = workflow.apply_preset(prompt, "standard")
+    assert preset["split"] == 2
+    assert prompt["11"]["inputs"]["model"] == ["9", 0]
+    assert prompt["12"]["inputs"]["model"] == ["10", 0]
+    assert "120" not in prompt and "130" not in prompt
+
+
+def test_quality_preset_chains_patches(prompt):
+    preset = workflow.apply_preset(prompt, "quality")
+    assert preset["split"] == 4
+    assert prompt["11"]["inputs"]["scheduler"] == "beta"
+    # ModelSamplingSD3 -> attention (120) -> step cache (121) -> sampler
+    assert prompt["120"]["inputs"]["model"] == ["9", 0]
+    assert prompt["121"]["class_type"] == "EasyCache"
+    assert prompt["121"]["inputs"]["model"] == ["120", 0]
+    assert prompt["11"]["inputs"]["model"] == ["121", 0]
+    assert prompt["12"]["inputs"]["model"] == ["131", 0]
+    assert_refs_exist(prompt)
+
+
+def test_preset_steps_override(prompt):
+    preset = workflow.apply_preset(prompt, "standard", steps=6)
+    assert preset["split"] == 3
+    assert prompt["11"]["inputs"]["steps"] == 6
+    assert prompt["12"]["inputs"]["steps"] == 6
+
+
+def test_preset_rejects_single_step(prompt):
+    with pytest.raises(Exception, match="steps must be >= 2"):
+        workflow.apply_preset(prompt, "standard", steps=1)
+
+
+def test_unknown_preset(prompt):
+    with pytest.raises(Exception, match="Unknown preset"):
+        workflow.apply_preset(prompt, "turbo")
+
+
+def test_apply_loras(prompt):
+    pairs = workflow.normalize_lora_pairs([
+        {"high": "a_high.safetensors", "low": "a_low.safetensors", "high_weight": 0.8},
+        {"high": "b_high.safetensors"},
+    ])
+    workflow.apply_loras(prompt, pairs)
+    # HIGH: 1 -> 100 -> 101 -> 9, LOW: 2 -> 110 -> 10
+    assert prompt["100"]["inputs"]["model"] == ["1", 0]
+    assert prompt["100"]["inputs"]["strength_model"] == 0.8
+    assert prompt["101"]["inputs"]["model"] == ["100", 0]
+    assert prompt["9"]["inputs"]["model"] == ["101", 0]
+    assert prompt["110"]["inputs"]["model"] == ["2", 0]
+    assert prompt["10"]["inputs"]["model"] == ["110", 0]
+    assert "111" not in prompt
+    assert_refs_exist(prompt)
+
+
+def test_lora_set_key_is_order_stable():
+    pairs = workflow.normalize_lora_pairs([{"high": "a.safetensors", "low": "b.safetensors"}])
+    assert workflow.lora_set_key([]) == ""
+    assert workflow.lora_set_key(pairs) == workflow.lora_set_key(json.loads(json.dumps(pairs)))
+
+
+def test_apply_upscale_with_model(prompt):
+    size = workflow.apply_upscale(prompt, 720, 1280, 2, "4x.pth", per_batch=8)
+    assert size == (352, 640)
+    assert prompt["8"]["inputs"]["width"] == 352
+    assert prompt["8"]["inputs"]["height"] == 640
+    assert prompt["141"]["class_type"] == "DaSiWaUpscaleFrames"
+    assert prompt["141"]["inputs"]["images"] == ["13", 0]
+    assert prompt["141"]["inputs"]["upscale_model"] == ["140", 0]
+    assert (prompt["141"]["inputs"]["width"], prompt["141"]["inputs"]["height"]) == (720, 1280)
+    assert prompt["14"]["inputs"]["images"] == ["141", 0]
+    assert "142" not in prompt
+    assert_refs_exist(prompt)
+
+
+def test_apply_upscale_lanczos(prompt):
+    workflow.apply_upscale(prompt, 528, 768, 1.5)
+    assert (prompt["8"]["inputs"]["width"], prompt["8"]["inputs"]["height"]) == (352, 512)
+    assert prompt["142"]["class_type"] == "ImageScale"
+    assert prompt["142"]["inputs"]["image"] == ["13", 0]
+    assert prompt["14"]["inputs"]["images"] == ["142", 0]
+    assert "140" not in prompt and "141" not in prompt
+
+
+def test_apply_interpolation_after_upscale(prompt):
+    fps = prompt["14"]["inputs"]["frame_rate"]
+    workflow.apply_upscale(prompt, 528, 768, 2)
+    assert workflow.apply_interpolation(prompt, 2, "blend") == fps * 2
+    assert prompt["150"]["class_type"] == "DaSiWaFrameBlend"
+    assert prompt["150"]["inputs"]["frames"] == ["142", 0]
+    assert prompt["14"]["inputs"]["images"] == ["150", 0]
+    assert_refs_exist(prompt)
+
+
+def test_apply_interpolation_unknown_method(prompt):
+    with pytest.raises(Exception, match="Unknown interpolation method"):
+        workflow.apply_interpolation(prompt, 2, "optical-flow")
+
+
+def test_apply_external_encoding(prompt):
+    workflow.apply_interpolation(prompt, 2, "rife")
+    combine = dict(prompt["14"]["inputs"])
+    settings = workflow.apply_external_encoding(prompt)
+    assert settings == {"frame_rate": combine["frame_rate"], "crf": combine["crf"], "pix_fmt": combine["pix_fmt"]}
+    assert prompt["14"]["class_type"] == "DaSiWaSaveRawFrames"
+    assert prompt["14"]["inputs"]["images"] == ["150", 0]
+    assert prompt["14"]["inputs"]["frame_rate"] == combine["frame_rate"]
+    assert_refs_exist(prompt)
+
+
+def test_apply_text_cache_keeps_encoder_lazy(prompt):
+    prompt["4"]["inputs"]["device"] = "cpu"
+    workflow.apply_text_cache(prompt, "/tmp/cache", 64)
+    for node_id in ("5", "6"):
+        inputs = prompt[node_id]["inputs"]
+        assert prompt[node_id]["class_type"] == "DaSiWaCachedTextEncode"
+        assert inputs["clip"] == ["4", 0]
+        assert inputs["device"] == "cpu"
+    assert prompt["4"]["class_type"] == "CLIPLoader"
+    assert_refs_exist(prompt)
@@ -0,0 +1,395 @@
+"""
+Pure transforms for the DaSiWa I2V API workflow (dasiwa_i2v_api.json).
+
+Every function here takes the prompt dict loaded from the workflow template,
+edits it in place and returns it, without talking to ComfyUI. This keeps the
+graph rewiring testable on its own.
+"""
+
+import json
+
+# Node ids of the base template
+HIGH_CHECKPOINT_NODE = "1"
+LOW_CHECKPOINT_NODE = "2"
+VAE_LOADER_NODE = "3"
+CLIP_LOADER_NODE = "4"
+TEXT_ENCODE_NODES = ("5", "6")
+HIGH_SHIFT_NODE = "9"
+LOW_SHIFT_NODE = "10"
+HIGH_SAMPLER_NODE = "11"
+LOW_SAMPLER_NODE = "12"
+IMAGE_TO_VIDEO_NODE = "8"
+VAE_DECODE_NODE = "13"
+VIDEO_COMBINE_NODE = "14"
+
+# Inserted LoRA nodes: HIGH chain uses 100.., LOW chain uses 110..
+LORA_HIGH_NODE_BASE = 100
+LORA_LOW_NODE_BASE = 110
+MAX_LORA_PAIRS = 4
+
+# Inserted preset model patches: HIGH chain uses 120.., LOW chain uses 130..
+PATCH_HIGH_NODE_BASE = 120
+PATCH_LOW_NODE_BASE = 130
+
+# Speed/quality presets. "speed" is an estimate (from step count and sampled
+# pixels, not measured) of sampling speed relative to "standard" at the same
+# requested resolution and length (VAE encode/decode not included).
+#   steps          - total denoising steps
+#   high_fraction  - share of steps sampled by the HIGH expert (split point)
+#   sampler/scheduler - KSamplerAdvanced settings for both experts
+#   step_cache     - EasyCache settings (reuses model output between similar steps), or None
+#   attention      - KJNodes PathchSageAttentionKJ mode, or None to keep the server default
+#   upscale        - default internal-resolution factor (see apply_upscale), used when the job sets none
+PRESETS = {
+    "draft": {
+        "description": "2 steps at 1/1.5 resolution, upscaled - previews and prompt iteration",
+        "speed": 3.0,
+        "steps": 2,
+        "high_fraction": 0.5,
+        "sampler": "euler",
+        "scheduler": "simple",
+        "step_cache": None,
+        # "auto" picks the fastest kernel the GPU supports (fp8 kernels need SM89+)
+        "attention": "auto",
+        "upscale": 1.5,
+    },
+    "standard": {
+        "description": "4 steps, DaSiWa defaults",
+        "speed": 1.0,
+        "steps": 4,
+        "high_fraction": 0.5,
+        "sampler": "euler",
+        "scheduler": "simple",
+        "step_cache": None,
+        "attention": None,
+        "upscale": 1,
+    },
+    "quality": {
+        "description": "8 steps, beta schedule, step caching on the redundant middle steps",
+        "speed": 0.6,
+        "steps": 8,
+        "high_fraction": 0.5,
+        "sampler": "euler",
+        "scheduler": "beta",
+        "step_cache": {"reuse_threshold": 0.2, "start_percent": 0.15, "end_percent": 0.95},
+        "attention": "disabled",
+        "upscale": 1,
+    },
+}
+DEFAULT_PRESET = "standard"
+
+# Inserted upscale nodes
+UPSCALE_LOADER_NODE = "140"
+UPSCALE_MODEL_NODE = "141"
+UPSCALE_RESIZE_NODE = "142"
+
+# Inserted frame interpolation node
+INTERPOLATION_NODE = "150"
+INTERPOLATION_METHODS = ("rife", "blend")
+
+# Video encoding: inside the graph (VHS_VideoCombine) or by the handler from raw frames
+ENCODE_MODES = ("graph", "external")
+
+
+def normalize_lora_pairs(lora_pairs):
+    """Validate lora_pairs from the job input and return a normalized list"""
+    if not lora_pairs:
+        return []
+    if not isinstance(lora_pairs, list):
+        raise Exception(f"lora_pairs must be a list, got: {type(lora_pairs).__name__}")
+
+    normalized = []
+    for pair in lora_pairs[:MAX_LORA_PAIRS]:
+        if not isinstance(pair, dict) or not (pair.get("high") or pair.get("low")):
+            raise Exception(f"Invalid LoRA pair (expected 'high' and/or 'low'): {pair}")
+        normalized.append({
+            "high": pair.get("high"),
+            "low": pair.get("low"),
+            "high_weight": float(pair.get("high_weight", 1.0)),
+            "low_weight": float(pair.get("low_weight", 1.0)),
+        })
+    return normalized
+
+
+def lora_set_key(lora_pairs):
+    """Stable key identifying a LoRA set (empty string means no LoRAs)"""
+    if not lora_pairs:
+        return ""
+    return json.dumps(lora_pairs, sort_keys=True)
+
+
+def _insert_lora_chain(prompt, source_node, target_node, node_base, loras):
+    """Insert LoraLoaderModelOnly nodes between source_node and target_node"""
+    model_ref = [source_node, 0]
+    for index, (lora_name, weight) in enumerate(loras):
+        node_id = str(node_base + index)
+        prompt[node_id] = {
+            "inputs": {
+                "lora_name": lora_name,
+                "strength_model": weight,
+                "model": model_ref,
+            },
+            "class_type": "LoraLoaderModelOnly",
+            "_meta": {
+                "title": f"LoRA {index + 1} ({lora_name})"
+            }
+        }
+        model_ref = [node_id, 0]
+    prompt[target_node]["inputs"]["model"] = model_ref
+
+
+def apply_loras(prompt, lora_pairs):
+    """Insert HIGH/LOW LoRA loaders after checkpoints 1 and 2"""
+    high_loras = [(p["high"], p["high_weight"]) for p in lora_pairs if p.get("high")]
+    low_loras = [(p["low"], p["low_weight"]) for p in lora_pairs if p.get("low")]
+
+    _insert_lora_chain(prompt, HIGH_CHECKPOINT_NODE, HIGH_SHIFT_NODE, LORA_HIGH_NODE_BASE, high_loras)
+    _insert_lora_chain(prompt, LOW_CHECKPOINT_NODE, LOW_SHIFT_NODE, LORA_LOW_NODE_BASE, low_loras)
+    return prompt
+
+
+def _insert_model_patch(prompt, sampler_node, node_id, class_type, inputs, title):
+    """Insert a MODEL -> MODEL patch node right before a sampler"""
+    patch_inputs = dict(inputs)
+    patch_inputs["model"] = prompt[sampler_node]["inputs"]["model"]
+    prompt[node_id] = {
+        "inputs": patch_inputs,
+        "class_type": class_type,
+        "_meta": {
+            "title": title
+        }
+    }
+    prompt[sampler_node]["inputs"]["model"] = [node_id, 0]
+
+
+def split_steps(steps, high_fraction):
+    """Return the step where sampling switches from the HIGH to the LOW expert
+
+    Both experts always get at least one step: with split 0 the HIGH pass would
+    return the un-noised empty latent to a LOW pass that adds no noise.
+    """
+    return min(max(int(steps * high_fraction), 1), steps - 1)
+
+
+def apply_preset(prompt, preset_name=DEFAULT_PRESET, steps=None):
+    """Compile a speed/quality preset into the sampling part of the graph
+
+    Returns the resolved settings (steps may be overridden by the caller).
+    """
+    if preset_name not in PRESETS:
+        raise Exception(f"Unknown preset: {preset_name} (available: {', '.join(PRESETS)})")
+    preset = dict(PRESETS[preset_name])
+    if steps is not None:
+        preset["steps"] = int(steps)
+    if preset["steps"] < 2:
+        raise Exception(f"steps must be >= 2 (one per HIGH/LOW expert), got: {preset['steps']}")
+    split = split_steps(preset["steps"], preset["high_fraction"])
+
+    for sampler_node in (HIGH_SAMPLER_NODE, LOW_SAMPLER_NODE):
+        inputs = prompt[sampler_node]["inputs"]
+        inputs["steps"] = preset["steps"]
+        inputs["sampler_name"] = preset["sampler"]
+        inputs["scheduler"] = preset["scheduler"]
+    prompt[HIGH_SAMPLER_NODE]["inputs"]["end_at_step"] = split
+    prompt[LOW_SAMPLER_NODE]["inputs"]["start_at_step"] = split
+
+    for sampler_node, node_base in ((HIGH_SAMPLER_NODE, PATCH_HIGH_NODE_BASE), (LOW_SAMPLER_NODE, PATCH_LOW_NODE_BASE)):
+        next_id = node_base
+        if preset["attention"]:
+            _insert_model_patch(prompt, sampler_node, str(next_id), "PathchSageAttentionKJ",
+                                {"sage_attention": preset["attention"]}, "Attention Mode")
+            next_id += 1
+        if preset["step_cache"]:
+            step_cache = dict(preset["step_cache"], verbose=False)
+            _insert_model_patch(prompt, sampler_node, str(next_id), "EasyCache", step_cache, "Step Cache")
+            next_id += 1
+
+    preset["name"] = preset_name
+    preset["split"] = split
+    return preset
+
+
+def upscale_internal_size(width, height, factor):
+    """Reduced sampling resolution for a target size, in multiples of 16"""
+    if factor < 1:
+        raise Exception(f"upscale factor must be >= 1, got: {factor}")
+    internal_width = max(int(round(width / factor / 16.0)) * 16, 16)
+    internal_height = max(int(round(height / factor / 16.0)) * 16, 16)
+    return internal_width, internal_height
+
+
+def apply_upscale(prompt, width, height, factor, upscale_model=None, per_batch=16):
+    """Sample at a reduced resolution and upscale decoded frames to width x height
+
+    With an upscale model the frames go through DaSiWaUpscaleFrames, which
+    upscales per_batch frames at a time and resizes each batch to the exact
+    target before the next one, so only one batch is held at model scale;
+    without one a lanczos ImageScale is used.
+    """
+    internal_width, internal_height = upscale_internal_size(width, height, factor)
+    prompt[IMAGE_TO_VIDEO_NODE]["inputs"]["width"] = internal_width
+    prompt[IMAGE_TO_VIDEO_NODE]["inputs"]["height"] = internal_height
+
+    image_ref = [VAE_DECODE_NODE, 0]
+    if upscale_model:
+        prompt[UPSCALE_LOADER_NODE] = {
+            "inputs": {
+                "model_name": upscale_model
+            },
+            "class_type": "UpscaleModelLoader",
+            "_meta": {
+                "title": "Upscale Model Loader"
+            }
+        }
+        prompt[UPSCALE_MODEL_NODE] = {
+            "inputs": {
+                "width": width,
+                "height": height,
+                "per_batch": per_batch,
+                "upscale_method": "lanczos",
+                "upscale_model": [UPSCALE_LOADER_NODE, 0],
+                "images": image_ref
+            },
+            "class_type": "DaSiWaUpscaleFrames",
+            "_meta": {
+                "title": "Upscale Frames"
+            }
+        }
+        prompt[VIDEO_COMBINE_NODE]["inputs"]["images"] = [UPSCALE_MODEL_NODE, 0]
+    else:
+        prompt[UPSCALE_RESIZE_NODE] = {
+            "inputs": {
+                "upscale_method": "lanczos",
+                "width": width,
+                "height": height,
+                "crop": "disabled",
+                "image": image_ref
+            },
+            "class_type": "ImageScale",
+            "_meta": {
+                "title": "Resize To Output"
+            }
+        }
+        prompt[VIDEO_COMBINE_NODE]["inputs"]["images"] = [UPSCALE_RESIZE_NODE, 0]
+    return internal_width, internal_height
+
+
+def apply_interpolation(prompt, multiplier, method="rife"):
+    """Synthesize multiplier - 1 frames between sampled frames before node 14
+
+    The sampled frames keep their timing, so the output frame_rate is raised by
+    the same multiplier. Returns the output frame rate.
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise Exception(f"Unknown interpolation method: {method} (available: {', '.join(INTERPOLATION_METHODS)})")
+    image_ref = prompt[VIDEO_COMBINE_NODE]["inputs"]["images"]
+    if method == "rife":
+        prompt[INTERPOLATION_NODE] = {
+            "inputs": {
+                "ckpt_name": "rife47.pth",
+                "clear_cache_after_n_frames": 10,
+                "multiplier": multiplier,
+                "fast_mode": True,
+                "ensemble": True,
+                "scale_factor": 1.0,
+                "frames": image_ref
+            },
+            "class_type": "RIFE VFI",
+            "_meta": {
+                "title": "Frame Interpolation (RIFE)"
+            }
+        }
+    else:
+        prompt[INTERPOLATION_NODE] = {
+            "inputs": {
+                "multiplier": multiplier,
+                "frames": image_ref
+            },
+            "class_type": "DaSiWaFrameBlend",
+            "_meta": {
+                "title": "Frame Interpolation (Blend)"
+            }
+        }
+    prompt[VIDEO_COMBINE_NODE]["inputs"]["images"] = [INTERPOLATION_NODE, 0]
+    prompt[VIDEO_COMBINE_NODE]["inputs"]["frame_rate"] *= multiplier
+    return prompt[VIDEO_COMBINE_NODE]["inputs"]["frame_rate"]
+
+
+def apply_external_encoding(prompt):
+    """Replace VHS_VideoCombine with a raw frame sink; the handler encodes with ffmpeg
+
+    Returns the encoder settings of the replaced node (frame rate, crf, pix_fmt).
+    """
+    combine_inputs = prompt[VIDEO_COMBINE_NODE]["inputs"]
+    settings = {
+        "frame_rate": combine_inputs["frame_rate"],
+        "crf": combine_inputs["crf"],
+        "pix_fmt": combine_inputs["pix_fmt"],
+    }
+    prompt[VIDEO_COMBINE_NODE] = {
+        "inputs": {
+            "frame_rate": combine_inputs["frame_rate"],
+            "filename_prefix": combine_inputs["filename_prefix"],
+            "images": combine_inputs["images"]
+        },
+        "class_type": "DaSiWaSaveRawFrames",
+        "_meta": {
+            "title": "Save Raw Frames"
+        }
+    }
+    return settings
+
+
+def apply_text_cache(prompt, cache_dir, cache_max_mb):
+    """Replace CLIPTextEncode nodes 5/6 with cached encoders that load UMT5 only on a miss
+
+    CLIPLoader (node 4) stays in the graph behind a lazy input, so ComfyUI only
+    executes it on a miss and manages the loaded encoder like any other model.
+    """
+    clip_inputs = prompt[CLIP_LOADER_NODE]["inputs"]
+    for node_id in TEXT_ENCODE_NODES:
+        prompt[node_id]["inputs"] = {
+            "text": prompt[node_id]["inputs"]["text"],
+            "clip": [CLIP_LOADER_NODE, 0],
+            "clip_name": clip_inputs["clip_name"],
+            "type": clip_inputs["type"],
+            # Same placement as node 4 for the fallback load (residency text encoder policy)
+            "device": clip_inputs["device"],
+            "cache_dir": cache_dir,
+            "cache_max_mb": cache_max_mb,
+        }
+        prompt[node_id]["class_type"] = "DaSiWaCachedTextEncode"
+    return prompt
+
+
+def apply_latent_cache(prompt, cache_dir, cache_max_mb, memory_max_mb):
+    """Replace WanImageToVideo (node 8) with a variant that caches the start-image latent"""
+    node = prompt[IMAGE_TO_VIDEO_NODE]
+    node["inputs"].update({
+        "vae_name": prompt[VAE_LOADER_NODE]["inputs"]["vae_name"],
+        "cache_dir": cache_dir,
+        "cache_max_mb": cache_max_mb,
+        "memory_max_mb": memory_max_mb,
+    })
+    node["class_type"] = "DaSiWaCachedWanImageToVideo"
+    return prompt
+
+
+def apply_split_checkpoints(prompt, unet_names):
+    """Load diffusion-model-only files with UNETLoader instead of full checkpoints
+
+    unet_names maps checkpoint node ids ("1"/"2") to files in diffusion_models.
+    Both loaders output MODEL at index 0, so downstream wiring is unchanged.
+    """
+    for node_id, unet_name in unet_names.items():
+        prompt[node_id] = {
+            "inputs": {
+                "unet_name": unet_name,
+                "weight_dtype": "default"
+            },
+            "class_type": "UNETLoader",
+            "_meta": {
+                "title": prompt[node_id]["_meta"]["title"].replace("Checkpoint", "Diffusion Model")
+            }
+        }
+    return prompt